@@ -1,21 +1,54 @@
 from flask import Flask
-from config import Config
+from config import Config, DEFAULT_SECRET_KEY
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from flask_wtf.csrf import CSRFProtect
 
 db = SQLAlchemy()
 migrate = Migrate()
+csrf = CSRFProtect()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # Identiteten kommer från den signerade sessionskakan; med en känd nyckel kan vem som helst förfalska den
+    if app.config['AUTH_DEFAULT_USER_ID'] is None and app.config.get('SECRET_KEY') in (None, '', DEFAULT_SECRET_KEY):
+        raise RuntimeError('SECRET_KEY måste sättas till ett hemligt värde när inloggning krävs (AUTH_REQUIRED=1).')
+
+    from app import structured_logging
+    structured_logging.init_app(app)
+
+    from app import database
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options_for(
+            app.config['SQLALCHEMY_DATABASE_URI'], app.config
+        )
+    database.configure_binds(app)
 
     db.init_app(app)
+    database.init_app(app)
     migrate.init_app(app, db)
+    # Alla formulär och fetch-anrop som ändrar data skickar csrf_token eller X-CSRFToken
+    csrf.init_app(app)
+
+    from app import instrumentation
+    instrumentation.init_app(app)
+
+    from app.services import food_cache
+    food_cache.init_app(app)
+
+    from app.services import suggest_service
+    suggest_service.init_app(app)
+
+    from app.services import view_cache
+    view_cache.init_app(app)
 
     from app.routes import main_bp
     app.register_blueprint(main_bp)
 
     from app import models
 
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
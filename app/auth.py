@@ -0,0 +1,92 @@
+from flask import current_app, g, session, request, redirect, url_for, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import db
+from app.models import User
+
+# Endpoints som går att nå utan inloggning
+PUBLIC_ENDPOINTS = {'main.login', 'static'}
+
+
+def current_user_id():
+    """
+    Den inloggade användarens id för den här requesten, utan databasfråga:
+    från den signerade sessionskakan, annars AUTH_DEFAULT_USER_ID för
+    enanvändarinstallationer utan inloggning. None om ingen är inloggad.
+    """
+    if 'user_id' not in g:
+        g.user_id = session.get('user_id')
+        if g.user_id is None:
+            g.user_id = current_app.config['AUTH_DEFAULT_USER_ID']
+            if g.user_id is not None:
+                _ensure_default_user(g.user_id)
+    return g.user_id
+
+def _ensure_default_user(user_id):
+    """
+    Skapar standardanvändaren om `flask user seed` inte har körts, annars
+    faller loggningar på främmande nyckeln. Kontrolleras en gång per process.
+    """
+    checked = current_app.extensions.setdefault('auth_default_user_checked', set())
+    if user_id in checked:
+        return
+    if db.session.get(User, user_id) is None:
+        db.session.add(User(id=user_id, username='default'))
+        db.session.commit()
+    checked.add(user_id)
+
+def current_user():
+    """Laddar användarobjektet när det verkligen behövs (en fråga, sedan identity map)."""
+    user_id = current_user_id()
+    return db.session.get(User, user_id) if user_id is not None else None
+
+def _known_user(user_id):
+    """
+    Om användaren finns. Kända id:n cachas per process, så bara första
+    requesten med en ny session kostar en fråga.
+    """
+    known = current_app.extensions.setdefault('auth_known_user_ids', set())
+    if user_id in known:
+        return True
+    if db.session.get(User, user_id) is None:
+        return False
+    known.add(user_id)
+    return True
+
+def require_login():
+    """before_request för blueprinten. Sidor skickas till inloggningen, API-anrop får 401."""
+    user_id = session.get('user_id')
+    if user_id is not None and not _known_user(user_id):
+        # Sessionen hör till en borttagen användare
+        logout_user()
+    if request.endpoint in PUBLIC_ENDPOINTS or current_user_id() is not None:
+        return None
+    if request.path.startswith('/api/') or request.is_json:
+        return jsonify({'error': 'Inloggning krävs.'}), 401
+    return redirect(url_for('main.login', next=request.full_path if request.query_string else request.path))
+
+def login_user(user):
+    session.clear()
+    session['user_id'] = user.id
+    session.permanent = True
+    g.user_id = user.id
+
+def logout_user():
+    session.clear()
+    g.pop('user_id', None)
+
+def authenticate(username, password):
+    """Returnerar användaren om lösenordet stämmer, annars None."""
+    user = db.session.scalar(db.select(User).where(User.username == username))
+    if user is None or not user.password_hash:
+        # Räkna ändå en hash så att svarstiden inte avslöjar om användaren finns
+        check_password_hash(_DUMMY_HASH, password)
+        return None
+    if not check_password_hash(user.password_hash, password):
+        return None
+    return user
+
+def set_password(user, password):
+    user.password_hash = generate_password_hash(password)
+
+
+_DUMMY_HASH = generate_password_hash('ingen-användare')
@@ -0,0 +1,286 @@
+import sys
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from app.services import catalog_service
+from app import db
+from app.models import User
+from app import auth
+from app.services import nutrition_summary_service
+from app.services import energy_balance_service
+from app.services import log_import_service
+from app.services import log_export_service
+from app.services import view_cache
+from app.services import data_version
+
+food_cli = AppGroup('food', help='Hantera den lokala livsmedelskatalogen.')
+nutrition_cli = AppGroup('nutrition', help='Underhåll dagssummeringen av kostloggar.')
+energy_cli = AppGroup('energy', help='Uppskatta underhållskalorier och kalorimål.')
+user_cli = AppGroup('user', help='Hantera användare.')
+
+
+@food_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--source', required=True, help="Källans namn, t.ex. 'livsmedelsverket'.")
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json']), default=None,
+              help='Filformat. Gissas från filändelsen om det utelämnas.')
+@click.option('--delimiter', default=None, help='Fältavgränsare för CSV. Gissas om den utelämnas.')
+@click.option('--batch-size', default=1000, show_default=True, help='Antal rader per insert.')
+def import_foods(path, source, file_format, delimiter, batch_size):
+    """Importerar livsmedel från en CSV- eller JSON-export."""
+    started = time.perf_counter()
+    rows = catalog_service.read_food_file(path, file_format, delimiter)
+    imported, skipped = catalog_service.import_foods(rows, source, batch_size)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Importerade {imported} livsmedel ({skipped} överhoppade) på {elapsed:.1f} s.")
+
+
+@food_cli.command('rebuild-index')
+def rebuild_index():
+    """Bygger om fulltextindexet för katalogen."""
+    if catalog_service.rebuild_fts():
+        click.echo('Fulltextindexet har byggts om.')
+    else:
+        click.echo('FTS5 är inte tillgängligt för den här databasen, sökningen använder LIKE.')
+
+
+@nutrition_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Bygg bara om för en användare.')
+def rebuild_summary(user_id):
+    """Bygger om dagssummeringen från FoodLog."""
+    rows = nutrition_summary_service.rebuild(user_id)
+    click.echo(f"Dagssummeringen har byggts om ({rows} rader).")
+
+
+@nutrition_cli.command('verify')
+@click.option('--user-id', type=int, default=None, help='Kontrollera bara en användare.')
+def verify_summary(user_id):
+    """Kontrollerar att dagssummeringen stämmer med FoodLog."""
+    mismatches = nutrition_summary_service.verify(user_id)
+    if not mismatches:
+        click.echo('Dagssummeringen stämmer.')
+        return
+    for user, day, meal_type in mismatches:
+        click.echo(f"Avvikelse: användare {user}, {day}, {meal_type}")
+    raise click.exceptions.Exit(1)
+
+
+def _echo_estimate(user_id, estimate):
+    if estimate is None:
+        click.echo(f"Användare {user_id}: för lite data för en uppskattning.")
+        return
+    click.echo(
+        f"Användare {user_id}: underhåll {estimate['maintenance_calories']} kcal, "
+        f"mål {estimate['calorie_goal']:.0f} kcal ({estimate['method']}, {estimate['days_used']} dagar, "
+        f"trend {estimate['trend_change_per_week']:+.2f} kg/vecka)"
+    )
+
+
+def _after_goal_change(user_ids):
+    """
+    Ett nytt kalorimål syns på dashboarden: räkna upp dataversionen (som vycachen
+    i varje worker och ETaggarna jämför mot) och glöm cachade vyer.
+    """
+    for user_id in user_ids:
+        data_version.bump(user_id)
+    db.session.commit()
+    for user_id in user_ids:
+        view_cache.invalidate_user(user_id)
+
+
+@energy_cli.command('update')
+@click.option('--user-id', type=int, default=None, help='Räkna bara om för en användare.')
+def update_energy_balance(user_id):
+    """
+    Räknar om underhållskalorier och kalorimål från intag, träning och trendvikt.
+    Schemaläggs en gång per dygn; loggningar räknar inte om målet själva.
+    """
+    if user_id is None:
+        results = energy_balance_service.update_all()
+    else:
+        user = db.session.get(User, user_id)
+        if user is None:
+            raise click.ClickException(f"Användare {user_id} finns inte.")
+        results = {user_id: energy_balance_service.update_user(user)}
+        db.session.commit()
+    _after_goal_change(results)
+    for uid, estimate in results.items():
+        _echo_estimate(uid, estimate)
+
+
+@energy_cli.command('set-goal')
+@click.option('--user-id', type=int, required=True)
+@click.option('--weekly-change', type=float, required=True, help='Kg per vecka, negativt för att gå ner.')
+def set_weight_goal(user_id, weekly_change):
+    """Sätter önskad viktförändring per vecka och räknar om kalorimålet."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise click.ClickException(f"Användare {user_id} finns inte.")
+    user.weekly_weight_goal = weekly_change
+    estimate = energy_balance_service.update_user(user)
+    db.session.commit()
+    _after_goal_change([user_id])
+    _echo_estimate(user_id, estimate)
+
+
+@user_cli.command('create')
+@click.argument('username')
+@click.password_option(help='Lösenord. Frågas efter om det utelämnas.')
+def create_user(username, password):
+    """Skapar en användare som kan logga in."""
+    if db.session.scalar(db.select(User).where(User.username == username)) is not None:
+        raise click.ClickException(f"Användaren '{username}' finns redan.")
+    user = User(username=username)
+    auth.set_password(user, password)
+    db.session.add(user)
+    db.session.commit()
+    click.echo(f"Skapade användare '{username}' med id {user.id}.")
+
+
+@user_cli.command('set-password')
+@click.argument('username')
+@click.password_option()
+def set_user_password(username, password):
+    """Byter lösenord, t.ex. för standardanvändaren från tiden före inloggning."""
+    user = db.session.scalar(db.select(User).where(User.username == username))
+    if user is None:
+        raise click.ClickException(f"Användaren '{username}' finns inte.")
+    auth.set_password(user, password)
+    db.session.commit()
+    click.echo(f"Lösenordet för '{username}' har bytts.")
+
+
+@user_cli.command('seed')
+@click.option('--user-id', type=int, default=1, show_default=True)
+@click.option('--username', default='default', show_default=True)
+@click.option('--password', envvar='SEED_USER_PASSWORD', default=None,
+              help='Lösenord om användaren saknar ett. Läses från SEED_USER_PASSWORD eller frågas efter.')
+def seed_user(user_id, username, password):
+    """
+    Skapar standardanvändaren om den saknas. Körs vid varje driftsättning.
+    Med inloggning påslagen (AUTH_REQUIRED=1) får användaren också
+    ett lösenord om den saknar ett, annars skulle ingen kunna logga in.
+    """
+    user = db.session.get(User, user_id)
+    if user is None:
+        user = User(id=user_id, username=username)
+        db.session.add(user)
+        db.session.commit()
+        click.echo(f"Skapade användare {user_id} ('{username}').")
+    else:
+        click.echo(f"Användare {user_id} finns redan.")
+
+    if not user.password_hash and current_app.config['AUTH_DEFAULT_USER_ID'] is None:
+        if password is None:
+            if not sys.stdin.isatty():
+                raise click.ClickException(
+                    f"Användare {user_id} saknar lösenord och inloggning krävs. Sätt SEED_USER_PASSWORD, "
+                    f"kör `flask user set-password {user.username}` eller ta bort AUTH_REQUIRED."
+                )
+            password = click.prompt('Lösenord', hide_input=True, confirmation_prompt=True)
+        auth.set_password(user, password)
+        db.session.commit()
+        click.echo(f"Satte lösenord för '{user.username}'.")
+
+
+@click.command('import')
+@with_appcontext
+@click.argument('path', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--user-id', type=int, required=True)
+@click.option('--format', 'file_format', type=click.Choice(log_import_service.FORMATS), default=None,
+              help='Filformat. Gissas från filändelsen om det utelämnas.')
+@click.option('--table', default=None,
+              help="Tabell för poster utan 'table'-fält: weight, steps, food, cardio eller fight_rond.")
+@click.option('--delimiter', default=None, help='Fältavgränsare för CSV. Gissas om den utelämnas.')
+@click.option('--batch-size', type=int, default=None, help='Rader per transaktion (standard IMPORT_BATCH_SIZE).')
+@click.option('--replace-dates', is_flag=True,
+              help='Ersätt alla befintliga mat- och träningsloggar för importerade datum.')
+def import_logs(path, user_id, file_format, table, delimiter, batch_size, replace_dates):
+    """
+    Importerar loggar från JSON (t.ex. user_data.json), NDJSON eller CSV.
+    Filen läses strömmande; '-' läser från stdin. Rader som redan finns hoppas
+    över, så samma fil kan importeras flera gånger utan dubbletter.
+    """
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f"Användare {user_id} finns inte.")
+    try:
+        file_format = file_format or log_import_service.guess_format(path.name)
+    except log_import_service.ImportFormatError as e:
+        raise click.ClickException(str(e))
+
+    committed = {}
+
+    def progress(report):
+        committed.update(report)
+        click.echo(f"  {report['total']} rader, {report['rows_per_second']} rader/s", err=True)
+
+    try:
+        report = log_import_service.import_stream(
+            user_id, path, file_format,
+            default_table=table,
+            batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'],
+            delimiter=delimiter,
+            progress=progress,
+            replace_dates=replace_dates,
+        )
+    except (log_import_service.ImportFormatError, UnicodeDecodeError) as e:
+        if not committed:
+            raise click.ClickException(str(e))
+        view_cache.invalidate_user(user_id)
+        raise click.ClickException(
+            f"{e}. Importen avbröts och har bara delvis genomförts: {committed['total']} rader sparades."
+        )
+    view_cache.invalidate_user(user_id)
+
+    for name, count in report['imported'].items():
+        if count:
+            click.echo(f"  {name}: {count}")
+    for message in report['errors']:
+        click.echo(f"  Överhoppad {message}", err=True)
+    if report['ignored_keys']:
+        click.echo(f"  Ignorerade nycklar: {', '.join(report['ignored_keys'])}")
+    click.echo(
+        f"Importerade {report['total']} rader ({report['duplicates']} fanns redan, {report['skipped']} överhoppade) på "
+        f"{report['seconds']:.1f} s, {report['rows_per_second']} rader/s."
+    )
+
+
+@click.command('export')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Exportera bara en användare (annars alla, med user_id).')
+@click.option('--format', 'file_format', type=click.Choice(log_export_service.FORMATS), default='ndjson', show_default=True)
+@click.option('--table', 'tables', multiple=True, type=click.Choice(log_export_service.EXPORT_TABLES),
+              help='Tabell att exportera, kan anges flera gånger. Standard: alla. CSV kräver exakt en.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), default=None, help='Första datum (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), default=None, help='Sista datum (YYYY-MM-DD).')
+@click.option('--gzip', 'compress', is_flag=True, help='Komprimera. Sätts automatiskt för filnamn som slutar på .gz.')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Fil att skriva till, standard stdout.')
+def export_logs(user_id, file_format, tables, start, end, compress, output):
+    """Exporterar loggar och recept strömmande som NDJSON eller CSV."""
+    compress = compress or output.name.endswith('.gz')
+    try:
+        chunks = log_export_service.export_chunks(
+            user_id, tables or None, file_format,
+            start=start.date() if start else None,
+            end=end.date() if end else None,
+            compress=compress,
+            yield_per=current_app.config['EXPORT_YIELD_PER'],
+        )
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if output.name != '<stdout>':
+        click.echo(f"Skrev {written} byte till {output.name}.")
+
+
+def register_commands(app):
+    app.cli.add_command(food_cli)
+    app.cli.add_command(nutrition_cli)
+    app.cli.add_command(energy_cli)
+    app.cli.add_command(user_cli)
+    app.cli.add_command(import_logs)
+    app.cli.add_command(export_logs)
@@ -0,0 +1,177 @@
+import os
+import time
+from flask import current_app, g, has_request_context, session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from app import db
+
+REPLICA_BIND = 'replica'
+
+
+def _is_memory_sqlite(url):
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+def _is_read_only_sqlite(url):
+    return url.query.get('mode') == 'ro'
+
+def replica_uri_for(primary_uri, replica_setting):
+    """
+    Adressen till läsrepliken. 'ro' öppnar samma SQLite-fil skrivskyddat (i
+    WAL-läge blockerar läsare då aldrig skrivare), annat tolkas som en URL,
+    t.ex. till en PostgreSQL-replik. None betyder att repliken är avstängd.
+    """
+    if not replica_setting:
+        return None
+    if replica_setting != 'ro':
+        return replica_setting
+    url = make_url(primary_uri)
+    if url.get_backend_name() != 'sqlite' or _is_memory_sqlite(url):
+        raise ValueError("DATABASE_REPLICA_URL='ro' kräver en SQLite-fil som primär databas")
+    return f"sqlite:///file:{os.path.abspath(url.database)}?mode=ro&uri=true"
+
+def engine_options_for(uri, config):
+    """
+    Standardinställningar för SQLAlchemy-motorn beroende på databas. Används
+    bara när SQLALCHEMY_ENGINE_OPTIONS inte är satt i konfigurationen.
+    """
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        if _is_memory_sqlite(url):
+            return {}
+        return {
+            # Varje worker har en liten pool; SQLite tillåter ändå bara en skrivare åt gången
+            'pool_size': config['SQLITE_POOL_SIZE'],
+            'max_overflow': config['SQLITE_MAX_OVERFLOW'],
+            'connect_args': {
+                'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000,
+                'check_same_thread': False,
+            },
+        }
+    if backend == 'postgresql':
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        }
+    return {}
+
+def sqlite_pragmas(config, memory=False, read_only=False):
+    pragmas = [
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+        ('temp_store', 'MEMORY'),
+        ('foreign_keys', 'ON'),
+    ]
+    if not memory and not read_only:
+        # WAL låter läsare och en skrivare arbeta samtidigt; NORMAL räcker för hållbarhet i WAL-läge
+        pragmas = [
+            ('journal_mode', 'WAL'),
+            ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ] + pragmas
+    if not memory:
+        pragmas.append(('mmap_size', config['SQLITE_MMAP_SIZE']))
+    return pragmas
+
+def apply_sqlite_profile(engine, config):
+    """Sätter produktionsinställningarna på varje ny anslutning till en SQLite-motor."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(
+        config, memory=_is_memory_sqlite(engine.url), read_only=_is_read_only_sqlite(engine.url)
+    )
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def configure_binds(app):
+    """Lägger till läsrepliken som bind före db.init_app om den är konfigurerad."""
+    replica_uri = replica_uri_for(app.config['SQLALCHEMY_DATABASE_URI'], app.config['DATABASE_REPLICA_URL'])
+    if replica_uri is None:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPLICA_BIND] = {'url': replica_uri, **engine_options_for(replica_uri, app.config)}
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+def init_app(app):
+    """Anropas efter db.init_app: stänger läs-sessionen efter varje request och sätter SQLite-profilen på alla motorer."""
+    app.teardown_appcontext(close_read_session)
+    if not app.config['SQLITE_PRODUCTION_PROFILE']:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_profile(engine, app.config)
+
+
+# --- Läsningar mot repliken ---
+
+def read_your_writes():
+    """
+    Anropas efter en skrivning. Resten av requesten och användarens nästa
+    requests under READ_YOUR_WRITES_SECONDS läser från primären, så att t.ex.
+    sidan man skickas till efter en POST visar det som just sparades.
+    """
+    if not has_request_context():
+        return
+    g.read_primary = True
+    if REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        session['read_primary_until'] = time.time() + current_app.config['READ_YOUR_WRITES_SECONDS']
+
+def _must_read_primary():
+    if not has_request_context():
+        return False
+    if g.get('read_primary'):
+        return True
+    until = session.get('read_primary_until')
+    if until is None:
+        return False
+    if until > time.time():
+        return True
+    session.pop('read_primary_until', None)
+    return False
+
+def read_session():
+    """
+    Sessionen för läsningar. Med en replik får varje request en egen session
+    mot den, så att även lazy- och selectin-laddningar läser från repliken.
+    Utan replik, utanför requests och när read-your-writes gäller: db.session.
+    """
+    if REPLICA_BIND not in db.engines or not has_request_context() or _must_read_primary():
+        return db.session
+    replica_session = g.get('replica_session')
+    if replica_session is None:
+        replica_session = g.replica_session = Session(bind=db.engines[REPLICA_BIND], autoflush=False)
+    return replica_session
+
+def close_read_session(exception=None):
+    replica_session = g.pop('replica_session', None)
+    if replica_session is not None:
+        replica_session.close()
+
+
+class ReadSession:
+    """
+    Tunna omslag för tunga läsfrågor (statistik, grafer och listor) som får gå
+    mot läsrepliken. Objekten som returneras ska bara läsas; skrivningar går
+    alltid genom db.session.
+    """
+
+    def execute(self, statement, params=None, **kwargs):
+        return read_session().execute(statement, params, **kwargs)
+
+    def scalars(self, statement, params=None, **kwargs):
+        return read_session().scalars(statement, params, **kwargs)
+
+    def scalar(self, statement, params=None, **kwargs):
+        return read_session().scalar(statement, params, **kwargs)
+
+
+reads = ReadSession()
@@ -0,0 +1,26 @@
+import hashlib
+from flask import current_app, request
+
+
+def make_etag(*parts):
+    """Stark ETag av godtyckliga delar, t.ex. endpoint, användare, dataversion och query string."""
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+def not_modified(etag, cache_control):
+    """Returnerar ett 304-svar om klienten redan har `etag`, annars None."""
+    if etag not in request.if_none_match:
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def cacheable(response, cache_control, etag=None):
+    """Sätter Cache-Control och ETag. Utan etag beräknas den från svarskroppen."""
+    if etag is None:
+        response.add_etag()
+    else:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
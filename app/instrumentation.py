@@ -0,0 +1,253 @@
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from app import db
+
+# Endpoints som inte mäts, annars domineras siffrorna av statiska filer och skrapningar
+IGNORED_ENDPOINTS = {'static', 'metrics'}
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LOGGED_PARAMETERS = 500
+
+
+class RequestMetrics:
+    """Mätvärden för en request, ligger i g.request_metrics."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.fatsecret_count = 0
+        self.fatsecret_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+
+    def add_query(self, statement, elapsed):
+        self.db_count += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def as_dict(self, duration):
+        return {
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': self.db_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'db_slowest_ms': round(self.slowest_time * 1000, 2),
+            'db_slowest': _one_line(self.slowest_statement, 200) if self.slowest_statement else None,
+            'fatsecret_calls': self.fatsecret_count,
+            'fatsecret_ms': round(self.fatsecret_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+        }
+
+
+class MetricsRegistry:
+    """
+    Summerade mätvärden per endpoint i Prometheus textformat. Varje process
+    (gunicorn-worker) har sitt eget register, så /metrics visar den worker
+    som svarar; summera per instans i Prometheus.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.requests = {}     # (endpoint, method, status) -> antal
+        self.durations = {}    # endpoint -> [antal per hink..., summa, antal]
+        self.totals = {}       # (namn, endpoint) -> värde
+        self.slow_queries = 0
+
+    def observe(self, endpoint, method, status, duration, metrics):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.durations.setdefault(endpoint, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+
+            for name, value in (
+                ('db_queries_total', metrics.db_count),
+                ('db_query_seconds_total', metrics.db_time),
+                ('fatsecret_requests_total', metrics.fatsecret_count),
+                ('fatsecret_seconds_total', metrics.fatsecret_time),
+                ('template_render_seconds_total', metrics.render_time),
+            ):
+                self.totals[(name, endpoint)] = self.totals.get((name, endpoint), 0) + value
+
+    def slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                )
+
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for endpoint, histogram in sorted(self.durations.items()):
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram[-1]}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram[-2]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram[-1]}')
+
+            names = sorted({name for name, _ in self.totals})
+            for name in names:
+                lines.append(f'# TYPE {name} counter')
+                for (metric, endpoint), value in sorted(self.totals.items()):
+                    if metric == name:
+                        lines.append(f'{name}{{endpoint="{endpoint}"}} {value:g}')
+
+            lines.append('# TYPE db_slow_queries_total counter')
+            lines.append(f'db_slow_queries_total {self.slow_queries}')
+        return '\n'.join(lines) + '\n'
+
+
+def _one_line(statement, limit):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '…'
+
+def _current_metrics():
+    if not has_request_context():
+        return None
+    return g.get('request_metrics')
+
+def _registry():
+    return current_app.extensions.get('instrumentation')
+
+
+@contextmanager
+def timed_upstream():
+    """Mäter tiden för ett anrop till FatSecret. Gör inget när instrumenteringen är av."""
+    metrics = _current_metrics()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.fatsecret_count += 1
+            metrics.fatsecret_time += time.perf_counter() - started
+
+
+# --- Krokar ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _handle_error(exception_context):
+    # after_cursor_execute körs inte när frågan misslyckas
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+def _make_after_cursor_execute(app):
+    slow_seconds = app.config['SLOW_QUERY_MS'] / 1000
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics = _current_metrics()
+        if metrics is not None:
+            metrics.add_query(statement, elapsed)
+        if slow_seconds and elapsed >= slow_seconds:
+            app.extensions['instrumentation'].slow_query()
+            endpoint = request.endpoint if has_request_context() else None
+            app.logger.warning(
+                f"Långsam fråga ({elapsed * 1000:.1f} ms, {endpoint}): {_one_line(statement, 2000)} "
+                f"parametrar={str(parameters)[:MAX_LOGGED_PARAMETERS]}",
+                extra={'slow_query': {
+                    'duration_ms': round(elapsed * 1000, 2),
+                    'endpoint': endpoint,
+                    'statement': statement,
+                    'parameters': str(parameters)[:MAX_LOGGED_PARAMETERS],
+                }},
+            )
+
+    return after_cursor_execute
+
+def _before_render(sender, template, context, **extra):
+    metrics = _current_metrics()
+    if metrics is not None:
+        metrics.render_started = time.perf_counter()
+
+def _after_render(sender, template, context, **extra):
+    metrics = _current_metrics()
+    if metrics is not None and metrics.render_started is not None:
+        metrics.render_time += time.perf_counter() - metrics.render_started
+        metrics.render_started = None
+
+def _start_request():
+    if request.endpoint not in IGNORED_ENDPOINTS:
+        g.request_metrics = RequestMetrics()
+
+def _finish_request(response):
+    metrics = g.pop('request_metrics', None)
+    if metrics is None:
+        return response
+    duration = time.perf_counter() - metrics.started
+    endpoint = request.endpoint or 'unknown'
+
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_count} queries"',
+        f'fatsecret;dur={metrics.fatsecret_time * 1000:.1f}',
+        f'render;dur={metrics.render_time * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ])
+    _registry().observe(endpoint, request.method, response.status_code, duration, metrics)
+
+    values = metrics.as_dict(duration)
+    current_app.logger.info(
+        f"{request.method} {request.path} {response.status_code} {endpoint} "
+        + ' '.join(f'{key}={value}' for key, value in values.items() if key != 'db_slowest'),
+        extra={'request_metrics': {'endpoint': endpoint, 'status': response.status_code, **values}},
+    )
+    return response
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+    supplied = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+        return current_app.response_class('Unauthorized\n', status=401, mimetype='text/plain')
+    return current_app.response_class(_registry().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    """
+    Slår på instrumenteringen om INSTRUMENTATION_ENABLED är satt. Anropas efter
+    db.init_app så att alla motorer (även läsrepliken) får frågekrokarna.
+    /metrics registreras bara när METRICS_TOKEN är satt.
+    """
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+    app.extensions['instrumentation'] = MetricsRegistry()
+    if app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
+
+    after_cursor_execute = _make_after_cursor_execute(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # /metrics ligger utanför inloggningen och finns därför bara med en token
+    if app.config['METRICS_TOKEN']:
+        # Skyddas av bearer-token, inte av sessionskakan
+        from app import csrf
+        app.add_url_rule('/metrics', 'metrics', csrf.exempt(metrics_view))
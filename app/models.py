@@ -4,6 +4,15 @@ from datetime import date
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
+    password_hash = db.Column(db.String(256), nullable=True)
+    # Räknas upp vid varje loggning, används för ETags och cacheinvalidering
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Önskad viktförändring i kg per vecka (negativ för att gå ner), styr kalorimålet
+    weekly_weight_goal = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    # Uppskattat av energy_balance_service, None tills det finns tillräckligt med data
+    maintenance_calories = db.Column(db.Float, nullable=True)
+    calorie_goal = db.Column(db.Float, nullable=True)
+    energy_balance_date = db.Column(db.Date, nullable=True)
     weight_logs = db.relationship('WeightLog', backref='author', lazy='dynamic')
     
     def __init__(self, id=None, username=None):
@@ -21,6 +30,11 @@ class WeightLog(db.Model):
     weight = db.Column(db.Float, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # En vikt per användare och dag; indexet täcker även uppslag på (user_id, date)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='uq_weight_log_user_date'),
+    )
+
     def __repr__(self):
         return f'<WeightLog {self.date}: {self.weight}kg>'
 
@@ -37,6 +51,10 @@ class FoodLog(db.Model):
     base_servings_info = db.Column(db.String(200), nullable=True) # Sparar originalbeskrivning, t.ex. "Per 100g"
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_food_log_user_date', 'user_id', 'date'),
+    )
+
     def __repr__(self):
         return f'<FoodLog {self.date} - {self.meal_type}: {self.food_name} ({self.grams}g)>'
 
@@ -46,6 +64,11 @@ class StepLog(db.Model):
     steps = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # Ett stegvärde per användare och dag
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='uq_step_log_user_date'),
+    )
+
     def __repr__(self):
         return f'<StepLog {self.date}: {self.steps} steg>'
 
@@ -58,6 +81,10 @@ class CardioLog(db.Model):
     distance_km = db.Column(db.Float, nullable=True) # Ny kolumn för distans
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_cardio_log_user_date', 'user_id', 'date'),
+    )
+
     def __repr__(self):
         return f'<CardioLog {self.date}: {self.duration_seconds} sek, {self.calories_burned} kcal>'
 
@@ -68,6 +95,10 @@ class FightRondLog(db.Model):
     calories_burned = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_fight_rond_log_user_date', 'user_id', 'date'),
+    )
+
     def __repr__(self):
         return f'<FightRondLog {self.date}: {self.bpm} BPM>'
 
@@ -75,7 +106,29 @@ class Recipe(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    ingredients = db.relationship('RecipeIngredient', backref='recipe', lazy='dynamic', cascade="all, delete-orphan")
+    ingredients = db.relationship(
+        'RecipeIngredient', backref='recipe', lazy='select',
+        order_by='RecipeIngredient.id', cascade="all, delete-orphan"
+    )
+    # Summor över ingredienserna, räknas om av recipe_service när de ändras
+    ingredient_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_grams = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    total_calories = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    total_protein = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    total_carbohydrates = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    total_fat = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+    def per_100g(self):
+        """Näringstäthet per 100 g färdig rätt, eller None om receptet saknar vikt."""
+        if not self.total_grams:
+            return None
+        factor = 100 / self.total_grams
+        return {
+            'calories': self.total_calories * factor,
+            'protein': self.total_protein * factor,
+            'carbohydrates': self.total_carbohydrates * factor,
+            'fat': self.total_fat * factor,
+        }
 
     def __repr__(self):
         return f'<Recipe {self.name}>'
@@ -92,3 +145,35 @@ class RecipeIngredient(db.Model):
 
     def __repr__(self):
         return f'<RecipeIngredient {self.food_name} for Recipe ID {self.recipe_id}>'
+
+class Food(db.Model):
+    """Lokal livsmedelskatalog med näringsvärden per 100g, t.ex. importerad från Livsmedelsverket."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False, index=True)
+    calories = db.Column(db.Float, nullable=False)
+    protein = db.Column(db.Float, nullable=True)
+    carbohydrates = db.Column(db.Float, nullable=True)
+    fat = db.Column(db.Float, nullable=True)
+    source = db.Column(db.String(50), nullable=False)  # t.ex. 'livsmedelsverket', 'fatsecret'
+    external_id = db.Column(db.String(100), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('source', 'external_id', name='uq_food_source_external_id'),
+    )
+
+    def __repr__(self):
+        return f'<Food {self.name} ({self.source})>'
+
+class DailyNutritionSummary(db.Model):
+    """Summerat intag per användare, dag och måltid. Uppdateras i samma transaktion som FoodLog."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    meal_type = db.Column(db.String(50), primary_key=True)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbohydrates = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyNutritionSummary {self.date} - {self.meal_type}: {self.calories} kcal>'
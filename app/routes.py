@@ -1,15 +1,34 @@
-import re
-from flask import render_template, Blueprint, flash, redirect, url_for, request, current_app, jsonify
+import io
+import math
+from flask import render_template, Blueprint, flash, redirect, url_for, request, current_app, jsonify, stream_with_context
 from app import db
 from app.models import User, WeightLog, FoodLog, StepLog, CardioLog, FightRondLog, Recipe, RecipeIngredient
 from app.services import stats_service
 from app.services import fatsecret_service
+from app.services import suggest_service
+from app.services import nutrition_parser
+from app.services import catalog_service
+from app.services import nutrition_summary_service
+from app.services import downsampling
+from app.services import data_version
+from app.services import view_cache
+from app.services import food_log_service
+from app.services import recipe_service
+from app.services import training_service
+from app.services import log_import_service
+from app.services import log_export_service
+from app import http_cache
+from app.database import reads, read_your_writes
+from app.auth import current_user_id
+from app import auth
+from app.services.sql_helpers import upsert
 from flask_wtf import FlaskForm
-from wtforms import FloatField, DateField, SubmitField
+from wtforms import FloatField, DateField, SubmitField, StringField, PasswordField
 from wtforms.validators import DataRequired
 from datetime import date, timedelta
 
 main_bp = Blueprint('main', __name__)
+main_bp.before_request(auth.require_login)
 
 # --- Formulär ---
 class WeightForm(FlaskForm):
@@ -17,78 +36,75 @@ class WeightForm(FlaskForm):
     date = DateField('Datum', default=date.today, validators=[DataRequired()])
     submit = SubmitField('Spara Vikt')
 
+class LoginForm(FlaskForm):
+    username = StringField('Användarnamn', validators=[DataRequired()])
+    password = PasswordField('Lösenord', validators=[DataRequired()])
+    submit = SubmitField('Logga in')
+
 # --- Helper-funktioner ---
-def get_or_create_default_user():
-    """Hämtar eller skapar en standardanvändare för att säkerställa att appen fungerar."""
-    # Försök hämta användare med id 1
-    user = db.session.get(User, 1)
-    if user is None:
-        # Om användaren inte finns, skapa den
-        user = User(id=1, username='default')
-        db.session.add(user)
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            # Logga felet om det uppstår problem med att skapa användaren
-            current_app.logger.error(f"Kunde inte skapa standardanvändare: {e}")
-            raise
-    return user
+def after_log_write(user_id):
+    """
+    Anropas efter commit av en loggning: glöm cachade vyer och läs från
+    primären en stund. Kalorimålet räknas om av det schemalagda `flask energy update`.
+    """
+    view_cache.invalidate_user(user_id)
+    read_your_writes()
 
 
 # --- Routes ---
+@main_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    form = LoginForm()
+    error = None
+    if form.validate_on_submit():
+        user = auth.authenticate(form.username.data, form.password.data)
+        if user is not None:
+            auth.login_user(user)
+            next_url = request.args.get('next')
+            # Bara relativa adresser inom appen
+            if not next_url or not next_url.startswith('/') or next_url.startswith('//'):
+                next_url = url_for('main.dashboard')
+            return redirect(next_url)
+        error = 'Fel användarnamn eller lösenord.'
+    return render_template('login.html', title='Logga in', form=form, error=error)
+
+@main_bp.route('/logout', methods=['POST'])
+def logout():
+    auth.logout_user()
+    return redirect(url_for('main.login'))
+
 @main_bp.route('/')
 @main_bp.route('/dashboard')
 def dashboard():
     """Renderar dashboard-sidan."""
-    user = get_or_create_default_user()
-    weight_stats = stats_service.calculate_weight_stats(user.id)
-    calorie_stats = stats_service.calculate_calorie_stats(user.id)
-    
-    # Hämta data för grafen
-    logs_query = db.select(WeightLog).where(WeightLog.user_id == user.id).order_by(WeightLog.date.asc())
-    logs = db.session.scalars(logs_query).all()
-    
-    labels = [log.date.strftime('%Y-%m-%d') for log in logs]
-    data = [log.weight for log in logs]
-
-    return render_template(
-        'dashboard.html', 
-        title='Dashboard', 
-        weight_stats=weight_stats,
-        calorie_stats=calorie_stats,
-        labels=labels, 
-        data=data
-    )
+    user_id = current_user_id()
+    # Vymodellen cachas per användare och dataversion och invalideras vid varje loggning
+    view = view_cache.get_dashboard(user_id)
+    if view is None:
+        version = data_version.get(user_id)
+        view = stats_service.build_dashboard_view(user_id)
+        view_cache.set_dashboard(user_id, view, version)
+
+    return render_template('dashboard.html', title='Dashboard', **view)
 
 @main_bp.route('/weight', methods=['GET', 'POST'])
 def weight():
     form = WeightForm()
-    user = get_or_create_default_user()
+    user_id = current_user_id()
 
     if form.validate_on_submit():
-        # Kontrollera om en logg för detta datum redan finns
-        existing_log = db.session.scalar(
-            db.select(WeightLog).where(
-                WeightLog.user_id == user.id,
-                WeightLog.date == form.date.data
-            )
-        )
-        if existing_log:
-            existing_log.weight = form.weight.data
-            flash('Vikten för det valda datumet har uppdaterats!', 'success')
-        else:
-            new_log = WeightLog(weight=form.weight.data, date=form.date.data, user_id=user.id)
-            db.session.add(new_log)
-            flash('Ny vikt har loggats!', 'success')
-        
+        # Skapa eller uppdatera dagens vikt i en sats (unik per användare och datum)
+        stmt = upsert(WeightLog, index_elements=['user_id', 'date'], update_columns=['weight'])
+        db.session.execute(stmt, {'user_id': user_id, 'date': form.date.data, 'weight': form.weight.data})
+        data_version.bump(user_id)
         db.session.commit()
+        after_log_write(user_id)
+        flash('Vikten för det valda datumet har sparats!', 'success')
         return redirect(url_for('main.weight'))
 
-    # Hämta befintliga loggar
-    logs_query = db.select(WeightLog).where(WeightLog.user_id == user.id).order_by(WeightLog.date.desc())
-    logs = db.session.scalars(logs_query).all()
-    stats = stats_service.calculate_weight_stats(user.id)
+    # Befintliga loggar (nyast först) och statistik från samma beräkning
+    stats = stats_service.compute_weight_stats(user_id)
+    logs = list(reversed(stats['points']))
     
     return render_template('weight.html', title='Vikt', form=form, weight_logs=logs, stats=stats)
 
@@ -96,20 +112,18 @@ def weight():
 @main_bp.route('/training', methods=['GET', 'POST'])
 def training():
     """Renderar träningssidan och hanterar loggning av aktivitet."""
-    user = get_or_create_default_user()
+    user_id = current_user_id()
 
     if request.method == 'POST':
         if 'log_steps' in request.form:
             try:
                 steps = int(request.form.get('steps'))
-                # Sök efter befintlig logg för dagen
-                log = db.session.scalar(db.select(StepLog).where(StepLog.user_id==user.id, StepLog.date==date.today()))
-                if log:
-                    log.steps = steps # Uppdatera
-                else:
-                    log = StepLog(steps=steps, user_id=user.id) # Skapa ny
-                    db.session.add(log)
+                # Skapa eller uppdatera dagens logg i en sats
+                stmt = upsert(StepLog, index_elements=['user_id', 'date'], update_columns=['steps'])
+                db.session.execute(stmt, {'user_id': user_id, 'date': date.today(), 'steps': steps})
+                data_version.bump(user_id)
                 db.session.commit()
+                after_log_write(user_id)
                 flash(f"Loggade {steps} steg!", "success")
             except (ValueError, TypeError):
                 flash("Vänligen ange ett giltigt antal steg.", "danger")
@@ -137,10 +151,12 @@ def training():
                     duration_seconds=duration_seconds, 
                     calories_burned=calories_burned,
                     distance_km=distance,
-                    user_id=user.id
+                    user_id=user_id
                 )
                 db.session.add(log)
+                data_version.bump(user_id)
                 db.session.commit()
+                after_log_write(user_id)
                 flash(f"Loggade konditionspass!", "success")
             except (ValueError, TypeError):
                 flash("Vänligen fyll i puls och tid korrekt (t.ex. 9:34).", "danger")
@@ -150,34 +166,61 @@ def training():
                 bpm = int(request.form.get('bpm'))
                 # Kalorier för en 3-minuters rond
                 calories_burned = int(bpm * 3 * 0.08)
-                log = FightRondLog(bpm=bpm, calories_burned=calories_burned, user_id=user.id)
+                log = FightRondLog(bpm=bpm, calories_burned=calories_burned, user_id=user_id)
                 db.session.add(log)
+                data_version.bump(user_id)
                 db.session.commit()
+                after_log_write(user_id)
                 flash(f"Loggade fight-rond med {bpm} BPM! ({calories_burned} kcal)", "success")
             except (ValueError, TypeError):
                 flash("Vänligen ange en giltig puls.", "danger")
 
         return redirect(url_for('main.training'))
     
-    # Hämta dagens loggar för att visa på sidan
-    today = date.today()
-    step_log = db.session.scalar(db.select(StepLog).where(StepLog.user_id==user.id, StepLog.date==today))
-    cardio_logs = db.session.scalars(db.select(CardioLog).where(CardioLog.user_id==user.id, CardioLog.date==today)).all()
-    fight_rond_logs = db.session.scalars(db.select(FightRondLog).where(FightRondLog.user_id==user.id, FightRondLog.date==today)).all()
-        
-    return render_template('training.html', title='Träning', step_log=step_log, cardio_logs=cardio_logs, fight_rond_logs=fight_rond_logs)
+    # Dagens pass och veckans summor i en fråga
+    summary = training_service.get_training_summary(user_id)
+    return render_template('training.html', title='Träning', summary=summary)
+
+
+@main_bp.route('/api/training-summary')
+def training_summary_api():
+    """Träningssummering för idag och de senaste `days` dagarna (standard 7), för grafer."""
+    user_id = current_user_id()
+    try:
+        days = int(request.args.get('days', 7))
+    except ValueError:
+        return jsonify({'error': 'Ogiltigt antal dagar'}), 400
+    if not 1 <= days <= 365:
+        return jsonify({'error': 'Ogiltigt antal dagar'}), 400
+
+    cache_control = 'private, no-cache'
+    etag = http_cache.make_etag('training-summary', user_id, data_version.get(user_id), date.today(), days)
+    cached = http_cache.not_modified(etag, cache_control)
+    if cached is not None:
+        return cached
+
+    summary = training_service.get_training_summary(user_id, days=days)
+    return http_cache.cacheable(jsonify(summary), cache_control, etag)
 
 
 @main_bp.route('/status')
 def status():
     """Renderar statussidan med sammanfattad data."""
-    return render_template('status.html', title='Status')
+    user_id = current_user_id()
+    weight_stats = stats_service.compute_weight_stats(user_id)
+    return render_template('status.html', title='Status', weight_stats=weight_stats)
 
 
 @main_bp.route('/api/weight-data')
 def weight_data():
-    user = get_or_create_default_user()
+    """
+    Viktdata för grafer. `resolution=day|week|month` slår ihop till hinkar med
+    medel/min/max/antal och `points=N` glesar ut serien till högst N punkter (LTTB).
+    """
+    user_id = current_user_id()
     period = request.args.get('period', '30') # 30 dagar som standard
+    resolution = request.args.get('resolution')
+    max_points = request.args.get('points')
 
     if period == 'all':
         start_date = None
@@ -188,16 +231,41 @@ def weight_data():
         except ValueError:
             return jsonify({'error': 'Invalid period format'}), 400
 
-    query = db.select(WeightLog).where(WeightLog.user_id == user.id).order_by(WeightLog.date.asc())
+    if resolution is not None and resolution not in downsampling.RESOLUTIONS:
+        return jsonify({'error': 'Invalid resolution'}), 400
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            return jsonify({'error': 'Invalid points'}), 400
+        if max_points < 3:
+            return jsonify({'error': 'Invalid points'}), 400
+
+    # Oförändrad data sedan klientens senaste hämtning ger 304 utan att läsa viktloggarna
+    cache_control = 'private, no-cache'
+    etag = http_cache.make_etag(
+        'weight-data', user_id, data_version.get(user_id), start_date, resolution, max_points
+    )
+    cached = http_cache.not_modified(etag, cache_control)
+    if cached is not None:
+        return cached
+
+    query = db.select(WeightLog.date, WeightLog.weight).where(WeightLog.user_id == user_id).order_by(WeightLog.date.asc())
     if start_date:
         query = query.where(WeightLog.date >= start_date)
     
-    logs = db.session.scalars(query).all()
+    points = reads.execute(query).all()
 
-    labels = [log.date.strftime('%Y-%m-%d') for log in logs]
-    data = [log.weight for log in logs]
+    if resolution:
+        response = jsonify(downsampling.bucket_series(points, resolution))
+        return http_cache.cacheable(response, cache_control, etag)
+    if max_points:
+        points = downsampling.lttb(points, max_points)
 
-    return jsonify(labels=labels, data=data)
+    labels = [log_date.strftime('%Y-%m-%d') for log_date, _ in points]
+    data = [weight for _, weight in points]
+
+    return http_cache.cacheable(jsonify(labels=labels, data=data), cache_control, etag)
 
 
 @main_bp.route('/diet', methods=['GET', 'POST'])
@@ -206,30 +274,45 @@ def diet():
     search_results = None
     if request.method == 'POST' and 'search_ingredient' in request.form:
         search_term = request.form.get('search_ingredient')
-        print(f"--- SÖKER EFTER: '{search_term}' ---")
 
         if search_term:
-            token = fatsecret_service.get_fatsecret_token()
-            if token:
-                print("--- TOKEN MOTTAGEN ---")
-                search_data = fatsecret_service.search_food(search_term, token)
-                print(f"--- API-SVAR: {search_data} ---")
-
-                if search_data and 'foods' in search_data and 'food' in search_data['foods']:
-                    search_results = search_data['foods']['food']
-                else:
-                    flash('Inga resultat hittades för den söktermen.', 'info')
-                    if search_data and 'error' in search_data:
-                        error_message = search_data['error'].get('message', 'Okänt fel från API.')
-                        flash(f"API-fel: {error_message}", 'danger')
+            current_app.logger.info("Livsmedelssökning", extra={'search_term': search_term})
+            # Den lokala katalogen först, FatSecret bara när den saknar bra träffar
+            local_results = catalog_service.search_catalog(search_term)
+            if catalog_service.has_good_match(local_results):
+                search_results = nutrition_parser.annotate_foods(local_results)
             else:
-                print("--- FEL: KUNDE INTE HÄMTA TOKEN ---")
-                flash('Kunde inte ansluta till FatSecret. Kontrollera API-nycklarna.', 'danger')
+                token = fatsecret_service.get_fatsecret_token()
+                if token:
+                    search_data = fatsecret_service.search_food(search_term, token)
+                    # Hela svaret bara på DEBUG och för ett urval av sökningarna; stora svar kortas av
+                    current_app.logger.debug(
+                        "Svar från FatSecret",
+                        extra={'search_term': search_term, 'payload': search_data,
+                               'sample_rate': current_app.config['LOG_PAYLOAD_SAMPLE_RATE']},
+                    )
+
+                    if search_data and 'foods' in search_data and 'food' in search_data['foods']:
+                        fatsecret_results = nutrition_parser.annotate_foods(search_data['foods']['food'])
+                        search_results = nutrition_parser.annotate_foods(local_results) + fatsecret_results
+                    elif local_results:
+                        search_results = nutrition_parser.annotate_foods(local_results)
+                    else:
+                        flash('Inga resultat hittades för den söktermen.', 'info')
+                        if search_data and 'error' in search_data:
+                            error_message = search_data['error'].get('message', 'Okänt fel från API.')
+                            flash(f"API-fel: {error_message}", 'danger')
+                elif local_results:
+                    search_results = nutrition_parser.annotate_foods(local_results)
+                else:
+                    current_app.logger.warning("Kunde inte hämta FatSecret-token", extra={'search_term': search_term})
+                    flash('Kunde inte ansluta till FatSecret. Kontrollera API-nycklarna.', 'danger')
 
     # Hämta dagens loggade mat
-    user = get_or_create_default_user()
-    today_logs_query = db.select(FoodLog).where(FoodLog.user_id == user.id, FoodLog.date == date.today()).order_by(FoodLog.id)
-    today_logs = db.session.scalars(today_logs_query).all()
+    user_id = current_user_id()
+    day_summary = nutrition_summary_service.get_day_summary(user_id, date.today())
+    today_logs_query = db.select(FoodLog).where(FoodLog.user_id == user_id, FoodLog.date == date.today()).order_by(FoodLog.id)
+    today_logs = reads.scalars(today_logs_query).all()
 
     # Gruppera efter måltidstyp
     grouped_logs = {}
@@ -238,13 +321,13 @@ def diet():
             grouped_logs[log.meal_type] = []
         grouped_logs[log.meal_type].append(log)
 
-    return render_template('diet.html', title='Kost', search_results=search_results, food_logs=grouped_logs)
+    return render_template('diet.html', title='Kost', search_results=search_results, food_logs=grouped_logs, day_summary=day_summary)
 
 
 @main_bp.route('/recipes', methods=['GET', 'POST'])
 def recipes():
     """Visar sidan för att hantera recept och hanterar skapande av nya."""
-    user = get_or_create_default_user()
+    user_id = current_user_id()
 
     if request.method == 'POST':
         data = request.get_json()
@@ -254,29 +337,54 @@ def recipes():
         if not recipe_name or not ingredients:
             return jsonify({'error': 'Receptnamn och ingredienser krävs.'}), 400
 
-        new_recipe = Recipe(name=recipe_name, user_id=user.id)
+        try:
+            # Ingredienser räknas om från food_description i gram eller portioner
+            ingredients = [food_log_service.build_recipe_ingredient(ing) for ing in ingredients]
+        except food_log_service.FoodLogError as e:
+            return jsonify({'error': str(e)}), 400
+
+        new_recipe = Recipe(name=recipe_name, user_id=user_id)
         db.session.add(new_recipe)
         db.session.flush() # För att få ett ID till new_recipe
 
         for ing in ingredients:
-            new_ingredient = RecipeIngredient(
-                recipe_id=new_recipe.id,
-                food_name=ing['food_name'],
-                grams=ing['grams'],
-                calories=ing['calories'],
-                protein=ing['protein'],
-                carbohydrates=ing['carbohydrates'],
-                fat=ing['fat']
-            )
-            db.session.add(new_ingredient)
-        
+            db.session.add(RecipeIngredient(recipe_id=new_recipe.id, **ing))
+
+        recipe_service.recompute_totals([new_recipe.id])
+        data_version.bump(user_id)
         db.session.commit()
+        after_log_write(user_id)
+        for ing in ingredients:
+            suggest_service.remember_food_name(user_id, ing['food_name'], source='recipe')
         return jsonify({'success': True, 'message': f"Receptet '{recipe_name}' har sparats!"})
 
-    recipes = db.session.scalars(db.select(Recipe).where(Recipe.user_id==user.id)).all()
+    # Summorna ligger på receptet, så listan behöver inte läsa ingredienserna
+    recipes = reads.scalars(db.select(Recipe).where(Recipe.user_id==user_id).order_by(Recipe.id.desc())).all()
     return render_template('recipes.html', title='Mina Recept', recipes=recipes)
 
 
+@main_bp.route('/api/recipes')
+def recipes_api():
+    """Sidindelad receptlista med summor och ingredienser (`ingredients=0` utelämnar dem)."""
+    user_id = current_user_id()
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', 20)), 100)
+    except ValueError:
+        return jsonify({'error': 'Ogiltig sida'}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'Ogiltig sida'}), 400
+    with_ingredients = request.args.get('ingredients', '1') != '0'
+
+    recipes, has_next = recipe_service.list_recipes(user_id, page, per_page, with_ingredients)
+    return jsonify({
+        'page': page,
+        'per_page': per_page,
+        'has_next': has_next,
+        'recipes': [recipe_service.recipe_to_dict(recipe, with_ingredients) for recipe in recipes],
+    })
+
+
 @main_bp.route('/api/search-food')
 def search_food_api():
     """API-endpoint för att söka efter livsmedel."""
@@ -284,76 +392,219 @@ def search_food_api():
     if not search_term:
         return jsonify({'error': 'Sökterm saknas'}), 400
     
-    token = fatsecret_service.get_fatsecret_token()
-    if not token:
-        return jsonify({'error': 'Kunde inte ansluta till FatSecret'}), 500
-        
-    search_data = fatsecret_service.search_food(search_term, token)
-    
-    if search_data and 'foods' in search_data and 'food' in search_data['foods']:
-        return jsonify(search_data['foods']['food'])
-    
-    return jsonify([])
+    results = catalog_service.search_catalog(search_term)
+    if not catalog_service.has_good_match(results):
+        token = fatsecret_service.get_fatsecret_token()
+        if not token and not results:
+            return jsonify({'error': 'Kunde inte ansluta till FatSecret'}), 500
+
+        search_data = fatsecret_service.search_food(search_term, token) if token else None
+        if search_data and 'foods' in search_data and 'food' in search_data['foods']:
+            foods = search_data['foods']['food']
+            results = results + (foods if isinstance(foods, list) else [foods])
+
+    # Samma sökning ger samma svar länge; webbläsaren får återanvända det och
+    # ETag från innehållet ger 304 när det ändå frågar igen
+    cache_control = f"private, max-age={current_app.config['FOOD_SEARCH_MAX_AGE']}"
+    return http_cache.cacheable(jsonify(nutrition_parser.annotate_foods(results)), cache_control)
+
+
+@main_bp.route('/api/food-suggest')
+def food_suggest_api():
+    """Typeahead-förslag från det lokala indexet. FatSecret anropas bara när indexet saknar träffar."""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 8)), 1), 20)
+    except ValueError:
+        return jsonify({'error': 'Ogiltig limit'}), 400
+
+    if len(query) < 2:
+        return jsonify([])
+
+    user_id = current_user_id()
+    index = suggest_service.get_index()
+    suggestions = index.suggest(query, limit, user_id)
+    if not suggestions:
+        token = fatsecret_service.get_fatsecret_token()
+        search_data = fatsecret_service.search_food(query, token)
+        if search_data and 'foods' in search_data and 'food' in search_data['foods']:
+            index.add_fatsecret_foods(search_data['foods']['food'])
+            suggestions = index.suggest(query, limit, user_id)
+
+    for suggestion in suggestions:
+        nutrients = nutrition_parser.parse_food(suggestion['food_id'], suggestion['food_description'])
+        suggestion['nutrients'] = nutrients.to_dict() if nutrients else None
+    return jsonify(suggestions)
 
 
 @main_bp.route('/diet/add', methods=['POST'])
 def add_food_log():
-    """Tar emot data från sökresultat, skalar näringsvärden och loggar i databasen."""
+    """
+    Tar emot data från sökresultat, skalar näringsvärden och loggar i databasen.
+    Livsmedel per 100 g loggas i gram; portioner utan vikt, t.ex. "Per 1 cup",
+    loggas som ett antal portioner (fältet servings).
+    """
+    user_id = current_user_id()
     try:
-        food_name = request.form.get('food_name')
-        food_description = request.form.get('food_description')
-        meal_type = request.form.get('meal_type')
-        grams = int(request.form.get('grams', 100))
-
-        # Extrahera näringsvärden per 100g
-        base_calories_match = re.search(r"Calories: ([\d.]+)kcal", food_description)
-        base_fat_match = re.search(r"Fat: ([\d.]+)g", food_description)
-        base_carbs_match = re.search(r"Carbs: ([\d.]+)g", food_description)
-        base_protein_match = re.search(r"Protein: ([\d.]+)g", food_description)
-
-        if not all([food_name, meal_type, base_calories_match]):
-            flash('Något gick fel, all data kunde inte läsas in.', 'danger')
-            return redirect(url_for('main.diet'))
-
-        # Hämta värden per 100g
-        cals_per_100g = float(base_calories_match.group(1))
-        fat_per_100g = float(base_fat_match.group(1)) if base_fat_match else 0
-        carbs_per_100g = float(base_carbs_match.group(1)) if base_carbs_match else 0
-        protein_per_100g = float(base_protein_match.group(1)) if base_protein_match else 0
-        
-        # Skala värden baserat på angivna gram
-        scaling_factor = grams / 100.0
-        
-        user = get_or_create_default_user()
-        new_log = FoodLog(
-            user_id=user.id,
-            food_name=food_name,
-            meal_type=meal_type,
-            grams=grams,
-            calories=cals_per_100g * scaling_factor,
-            fat=fat_per_100g * scaling_factor,
-            carbohydrates=carbs_per_100g * scaling_factor,
-            protein=protein_per_100g * scaling_factor,
-            base_servings_info=food_description,
-            date=date.today()
-        )
+        row = food_log_service.build_food_log_row(user_id, request.form.to_dict(), day=date.today())
+    except food_log_service.FoodLogError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('main.diet'))
+
+    new_log = FoodLog(**row)
+    db.session.add(new_log)
+    nutrition_summary_service.record_food_log(new_log)
+    data_version.bump(user_id)
+    db.session.commit()
+    after_log_write(user_id)
+    suggest_service.remember_food_name(user_id, new_log.food_name)
+    amount = row['base_servings_info'] if request.form.get('servings') else f"{row['grams']}g"
+    flash(f"{new_log.food_name} ({amount}) har lagts till i {new_log.meal_type}!", 'success')
+    return redirect(url_for('main.diet'))
 
-        db.session.add(new_log)
-        db.session.commit()
-        flash(f"{food_name} ({grams}g) har lagts till i {meal_type}!", 'success')
-    
-    except (ValueError, TypeError):
-        flash("Felaktig inmatning. Ange ett giltigt antal gram.", 'danger')
+@main_bp.route('/api/food-logs', methods=['POST'])
+def bulk_food_log_api():
+    """
+    Loggar flera livsmedel i ett anrop och en transaktion. Förväntar JSON:
+    {"meal_type": "Lunch", "date": "2024-05-01", "items": [{"food_name", "food_id",
+    "food_description", "grams", "meal_type"?}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list):
+        return jsonify({'error': 'items måste vara en lista.'}), 400
+
+    user_id = current_user_id()
+    try:
+        rows = food_log_service.log_items(user_id, items, meal_type=data.get('meal_type'), day=data.get('date'))
+    except food_log_service.FoodLogError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    data_version.bump(user_id)
+    db.session.commit()
+    after_log_write(user_id)
+    for name in {row['food_name'] for row in rows}:
+        suggest_service.remember_food_name(user_id, name)
+
+    totals = {column: sum(row[column] for row in rows) for column in nutrition_summary_service.SUMMARY_COLUMNS}
+    return jsonify({'success': True, 'logged': len(rows), 'totals': totals}), 201
+
+@main_bp.route('/api/import', methods=['POST'])
+def import_logs_api():
+    """
+    Importerar loggar från en uppladdad fil (fältet 'file') för inloggad användare.
+    Valfria formulärfält: format (json, ndjson, csv), table för poster utan tabell
+    och replace_dates=1 för att ersätta befintliga loggar för importerade datum.
+    Filen läses strömmande och skrivs i batcher, se log_import_service.
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'Ingen fil skickades.'}), 400
+
+    user_id = current_user_id()
+    # Varje batch committas för sig; senaste rapporten visar vad som hann skrivas vid ett fel
+    committed = {}
+    try:
+        file_format = request.form.get('format') or log_import_service.guess_format(upload.filename)
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = log_import_service.import_stream(
+            user_id, stream, file_format,
+            default_table=request.form.get('table'),
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+            progress=committed.update,
+            replace_dates=request.form.get('replace_dates') == '1',
+        )
+    except (log_import_service.ImportFormatError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        if not committed:
+            return jsonify({'error': str(e)}), 400
+        after_log_write(user_id)
+        return jsonify({
+            'error': f"{e}. Importen avbröts och har bara delvis genomförts: "
+                     f"{committed['total']} rader i {committed['batches']} batcher sparades.",
+            'partial': True,
+            'imported': committed['imported'],
+        }), 400
+
+    after_log_write(user_id)
+    return jsonify(report)
+
+@main_bp.route('/api/export')
+def export_logs_api():
+    """
+    Strömmar användarens loggar som NDJSON eller CSV. Parametrar: format
+    (ndjson, csv), tables (t.ex. 'weight,food,recipes'; CSV kräver exakt en,
+    även som table=weight), start och end (YYYY-MM-DD) samt gzip=1. Svaret
+    skickas i bitar medan raderna läses.
+    """
+    file_format = request.args.get('format', 'ndjson')
+    compress = request.args.get('gzip') == '1'
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Ogiltigt datum, använd YYYY-MM-DD.'}), 400
+    try:
+        tables = log_export_service.parse_tables(request.args.get('tables') or request.args.get('table'))
+        chunks = log_export_service.export_chunks(
+            current_user_id(), tables, file_format, start, end,
+            compress=compress, yield_per=current_app.config['EXPORT_YIELD_PER'],
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    response = current_app.response_class(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else log_export_service.MIMETYPES[file_format],
+    )
+    filename = log_export_service.export_filename(file_format, compress, date.today(), tables)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    # Låt en nginx framför appen skicka bitarna vidare direkt i stället för att buffra
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@main_bp.route('/recipes/<int:recipe_id>/log', methods=['POST'])
+def log_recipe(recipe_id):
+    """Loggar ett sparat recept skalat till gram eller portioner som matloggar för idag."""
+    user_id = current_user_id()
+    try:
+        amount = float(request.form.get('amount', 1))
+        if not math.isfinite(amount):
+            raise ValueError(amount)
+        unit = request.form.get('unit', 'portions')
+        recipe, item_count, totals = food_log_service.log_recipe(
+            user_id,
+            recipe_id,
+            request.form.get('meal_type'),
+            grams=amount if unit == 'grams' else None,
+            portions=amount if unit != 'grams' else None,
+        )
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        message = str(e) if isinstance(e, food_log_service.FoodLogError) else "Ange ett giltigt antal."
+        flash(message, 'danger')
+        return redirect(url_for('main.recipes'))
+
+    data_version.bump(user_id)
+    db.session.commit()
+    after_log_write(user_id)
+    flash(f"Receptet '{recipe.name}' ({item_count} ingredienser, {totals['calories']:.0f} kcal) har loggats!", 'success')
     return redirect(url_for('main.diet'))
 
 @main_bp.route('/diet/delete/<int:log_id>', methods=['POST'])
 def delete_food_log(log_id):
     """Tar bort en specifik matlogg."""
+    user_id = current_user_id()
     log_to_delete = db.session.get(FoodLog, log_id)
-    if log_to_delete:
+    # Andras loggar behandlas som om de inte fanns
+    if log_to_delete and log_to_delete.user_id == user_id:
+        nutrition_summary_service.remove_food_log(log_to_delete)
+        data_version.bump(user_id)
         db.session.delete(log_to_delete)
         db.session.commit()
+        after_log_write(user_id)
         flash("Matvaran har tagits bort.", "success")
     else:
         flash("Kunde inte hitta loggen att ta bort.", "warning")
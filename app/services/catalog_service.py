@@ -0,0 +1,177 @@
+import csv
+import json
+import re
+from flask import current_app
+from app import db
+from app.models import Food
+from app.services.sql_helpers import upsert
+
+# Kolumnnamn som accepteras vid import, t.ex. från Livsmedelsverkets export
+COLUMN_ALIASES = {
+    'name': ('name', 'food_name', 'namn', 'livsmedelsnamn'),
+    'calories': ('calories', 'kcal', 'energy_kcal', 'energi (kcal)', 'energi_kcal'),
+    'protein': ('protein',),
+    'carbohydrates': ('carbohydrates', 'carbs', 'kolhydrater'),
+    'fat': ('fat', 'fett'),
+    'external_id': ('external_id', 'id', 'nummer', 'livsmedelsnummer'),
+}
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# FTS5-tabellen skapas i migreringen och mappas inte som modell
+food_fts = db.table('food_fts', db.column('rowid'), db.column('name'))
+
+_fts_available = {}
+
+
+def fts_available():
+    """Om FTS5-tabellen från migreringen finns. Kontrolleras en gång per databas och process."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _fts_available:
+        available = False
+        if engine.dialect.name == 'sqlite':
+            available = db.session.execute(
+                db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'food_fts'")
+            ).first() is not None
+        _fts_available[key] = available
+    return _fts_available[key]
+
+def _fts_query(search_term):
+    # Varje ord som citerad prefixterm så att användarens text aldrig tolkas som FTS-syntax
+    tokens = TOKEN_PATTERN.findall(search_term)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def to_search_result(food):
+    """Formar en katalogpost som en FatSecret-träff så att sidor och API kan visa båda likadant."""
+    return {
+        'food_id': f'local-{food.id}',
+        'food_name': food.name,
+        'food_description': (
+            f"Per 100g - Calories: {food.calories:.0f}kcal | Fat: {food.fat or 0:.2f}g"
+            f" | Carbs: {food.carbohydrates or 0:.2f}g | Protein: {food.protein or 0:.2f}g"
+        ),
+        'food_type': 'Local',
+        'source': food.source,
+    }
+
+def search_catalog(search_term, limit=20):
+    """Söker i den lokala katalogen, med FTS5 om det finns och annars LIKE."""
+    if not search_term or not search_term.strip():
+        return []
+
+    if fts_available():
+        match = _fts_query(search_term)
+        if not match:
+            return []
+        query = (
+            db.select(Food)
+            .join(food_fts, food_fts.c.rowid == Food.id)
+            .where(db.text('food_fts MATCH :match'))
+            .order_by(db.text('bm25(food_fts)'), db.func.length(Food.name))
+            .limit(limit)
+        )
+        foods = db.session.scalars(query, {'match': match}).all()
+    else:
+        pattern = f"%{search_term.strip()}%"
+        query = (
+            db.select(Food)
+            .where(Food.name.ilike(pattern))
+            .order_by(db.func.length(Food.name))
+            .limit(limit)
+        )
+        foods = db.session.scalars(query).all()
+
+    return [to_search_result(food) for food in foods]
+
+def has_good_match(results):
+    """Om katalogträffarna räcker för att hoppa över FatSecret."""
+    return len(results) >= current_app.config['FOOD_CATALOG_MIN_RESULTS']
+
+
+# --- Import ---
+
+def _to_float(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().replace(',', '.').replace('\xa0', '')
+    return float(value) if value else None
+
+def normalize_row(row):
+    """Mappar en rå importrad till Food-kolumner. Returnerar None om namn eller kalorier saknas."""
+    lowered = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    values = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        values[column] = next((lowered[alias] for alias in aliases if alias in lowered), None)
+
+    name = (values['name'] or '').strip()
+    try:
+        calories = _to_float(values['calories'])
+        nutrients = {column: _to_float(values[column]) for column in ('protein', 'carbohydrates', 'fat')}
+    except ValueError:
+        return None
+    if not name or calories is None:
+        return None
+
+    external_id = values['external_id']
+    return {
+        'name': name[:200],
+        'calories': calories,
+        **nutrients,
+        # Namnet används som nyckel när källan saknar id så att en omimport inte dubblerar
+        'external_id': str(external_id).strip() if external_id not in (None, '') else name[:100],
+    }
+
+def read_food_file(path, file_format=None, delimiter=None):
+    """Läser rader från en CSV- eller JSON-fil (en lista av objekt) som dicts."""
+    file_format = file_format or ('json' if path.lower().endswith('.json') else 'csv')
+    if file_format == 'json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        yield from (data['foods'] if isinstance(data, dict) else data)
+        return
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if delimiter is None:
+            sample = f.read(4096)
+            f.seek(0)
+            delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+def import_foods(rows, source, batch_size=1000):
+    """
+    Importerar katalograder i batchar med executemany. Befintliga poster med samma
+    (source, external_id) uppdateras. Returnerar (importerade, överhoppade).
+    """
+    stmt = upsert(
+        Food,
+        index_elements=['source', 'external_id'],
+        update_columns=['name', 'calories', 'protein', 'carbohydrates', 'fat']
+    )
+    imported = skipped = 0
+    batch = []
+    for row in rows:
+        values = normalize_row(row)
+        if values is None:
+            skipped += 1
+            continue
+        values['source'] = source
+        batch.append(values)
+        if len(batch) >= batch_size:
+            db.session.execute(stmt, batch)
+            db.session.commit()
+            imported += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(stmt, batch)
+        db.session.commit()
+        imported += len(batch)
+    return imported, skipped
+
+def rebuild_fts():
+    """Bygger om FTS-indexet från food-tabellen."""
+    if not fts_available():
+        return False
+    db.session.execute(db.text("INSERT INTO food_fts(food_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
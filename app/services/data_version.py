@@ -0,0 +1,18 @@
+from app import db
+from app.models import User
+
+
+def bump(user_id):
+    """Räknar upp användarens dataversion. Körs i samma transaktion som loggningen."""
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def get(user_id):
+    """Användarens nuvarande dataversion via en enkel kolumnläsning, utan att ladda User."""
+    return db.session.execute(
+        db.select(User.data_version).where(User.id == user_id)
+    ).scalar() or 0
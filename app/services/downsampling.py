@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+RESOLUTIONS = ('day', 'week', 'month')
+
+
+def _bucket_start(day, resolution):
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    return day
+
+def _bucket_label(day, resolution):
+    return day.strftime('%Y-%m') if resolution == 'month' else day.strftime('%Y-%m-%d')
+
+def bucket_series(points, resolution):
+    """
+    Slår ihop (datum, värde)-par, sorterade på datum, till dag-, vecko- eller
+    månadshinkar med medel, min, max och antal.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Okänd upplösning: {resolution}")
+
+    labels, means, lows, highs, counts = [], [], [], [], []
+    current = None
+    total = count = 0
+    low = high = None
+
+    def flush():
+        labels.append(_bucket_label(current, resolution))
+        means.append(round(total / count, 2))
+        lows.append(low)
+        highs.append(high)
+        counts.append(count)
+
+    for day, value in points:
+        start = _bucket_start(day, resolution)
+        if start != current:
+            if current is not None:
+                flush()
+            current, total, count, low, high = start, 0.0, 0, value, value
+        total += value
+        count += 1
+        low = min(low, value)
+        high = max(high, value)
+    if current is not None:
+        flush()
+
+    return {'labels': labels, 'data': means, 'min': lows, 'max': highs, 'count': counts}
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets: väljer `threshold` punkter som behåller
+    seriens visuella form. Första och sista punkten behålls alltid.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    # Datum som ordningstal så att x-avstånd blir i dagar
+    xs = [day.toordinal() for day, _ in points]
+    ys = [value for _, value in points]
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Medelpunkt i nästa hink
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+from flask import current_app
+from app import db
+from app.database import reads
+from app.models import User, WeightLog, DailyNutritionSummary
+from app.services import training_service
+from app.services.stats_service import trend_step
+
+# Rimligt intervall för lutningen i regressionen (1 = varje överskottskalori syns i trendvikten)
+PLAUSIBLE_SLOPE = (0.25, 4.0)
+
+
+def _daily_trend(points, start, end, alpha):
+    """
+    Trendvikt (utjämnat medel) för varje dag start..end. Mellan mätningar
+    interpoleras linjärt, dagar före första och efter sista mätningen blir None.
+    """
+    known = []
+    trend_weight = previous_date = None
+    for log_date, weight in points:
+        if trend_weight is None:
+            trend_weight = weight
+        else:
+            trend_weight = trend_step(trend_weight, weight, (log_date - previous_date).days, alpha)
+        known.append((log_date, trend_weight))
+        previous_date = log_date
+
+    days = (end - start).days + 1
+    series = [None] * days
+    for (d0, w0), (d1, w1) in zip(known, known[1:]):
+        span = (d1 - d0).days
+        for offset in range(span + 1):
+            i = (d0 - start).days + offset
+            if 0 <= i < days:
+                series[i] = w0 + (w1 - w0) * offset / span
+    if len(known) == 1 and 0 <= (known[0][0] - start).days < days:
+        series[(known[0][0] - start).days] = known[0][1]
+    return series
+
+def load_daily_series(user_id, start, end, trend_alpha=None):
+    """
+    Dagliga serier för perioden: intag (None för dagar utan loggad mat),
+    förbrukning från träning och trendvikt. Tre frågor oavsett periodens längd.
+    Trendvikten sträcker sig en dag längre så att sista dagens förändring kan räknas.
+    """
+    if trend_alpha is None:
+        trend_alpha = current_app.config['WEIGHT_TREND_ALPHA']
+    days = (end - start).days + 1
+
+    intake_rows = reads.execute(
+        db.select(DailyNutritionSummary.date, db.func.sum(DailyNutritionSummary.calories))
+        .where(
+            DailyNutritionSummary.user_id == user_id,
+            DailyNutritionSummary.date.between(start, end)
+        )
+        .group_by(DailyNutritionSummary.date)
+    ).all()
+    intake = [None] * days
+    for day, calories in intake_rows:
+        intake[(day - start).days] = calories
+
+    burn_by_day = training_service.daily_burn(user_id, start, end)
+    burn = [burn_by_day.get(start + timedelta(days=i), 0) for i in range(days)]
+
+    # Hela historiken fram till periodens slut så att trenden hinner stabiliseras
+    points = reads.execute(
+        db.select(WeightLog.date, WeightLog.weight)
+        .where(WeightLog.user_id == user_id, WeightLog.date <= end + timedelta(days=1))
+        .order_by(WeightLog.date.asc())
+    ).all()
+    trend = _daily_trend(points, start, end + timedelta(days=1), trend_alpha)
+    return intake, burn, trend
+
+def estimate_maintenance(intake, burn, trend, kcal_per_kg=7700, min_days=10):
+    """
+    Uppskattar underhållskalorier (nettointag där trendvikten står still) ur
+    dagliga serier. Varje dag med loggad mat och trendvikt ger ett par
+    (nettointag, observerat överskott i kcal från trendviktens förändring).
+    En linjär regression överskott = a + b * nettointag ger underhåll = -a / b.
+    Blir lutningen orimlig, t.ex. när intaget varierar för lite, används
+    energibalansen direkt: medelintag minus medelöverskott.
+    Returnerar None om det finns färre än `min_days` användbara dagar.
+    """
+    x = []
+    y = []
+    for i, calories in enumerate(intake):
+        if calories is None or trend[i] is None or trend[i + 1] is None:
+            continue
+        x.append(calories - burn[i])
+        y.append((trend[i + 1] - trend[i]) * kcal_per_kg)
+
+    n = len(x)
+    if n < min_days:
+        return None
+
+    mean_x = sum(x) / n
+    mean_y = sum(y) / n
+    sxx = sum((xi - mean_x) ** 2 for xi in x)
+    sxy = sum((xi - mean_x) * (yi - mean_y) for xi, yi in zip(x, y))
+    slope = sxy / sxx if sxx else None
+
+    if slope is not None and PLAUSIBLE_SLOPE[0] <= slope <= PLAUSIBLE_SLOPE[1]:
+        intercept = mean_y - slope * mean_x
+        maintenance = -intercept / slope
+        method = 'regression'
+    else:
+        maintenance = mean_x - mean_y
+        method = 'energy_balance'
+
+    return {
+        'maintenance_calories': round(maintenance),
+        'method': method,
+        'slope': round(slope, 3) if slope is not None else None,
+        'days_used': n,
+        'avg_net_intake': round(mean_x),
+        'avg_intake': round(sum(c for c in intake if c is not None) / len([c for c in intake if c is not None])),
+        'avg_burn': round(sum(burn) / len(burn)),
+        'trend_change_per_week': round(mean_y / kcal_per_kg * 7, 2),
+    }
+
+def calorie_goal_for(maintenance, weekly_weight_goal, kcal_per_kg=7700):
+    """Dagligt kalorimål (nettointag) för önskad viktförändring per vecka, avrundat till 10 kcal."""
+    return round((maintenance + weekly_weight_goal * kcal_per_kg / 7) / 10) * 10
+
+def update_user(user, today=None):
+    """
+    Räknar om uppskattningen för användaren över de senaste veckorna och sparar
+    underhåll och kalorimål på användaren. Dagens ofullständiga intag räknas inte.
+    Körs i anroparens transaktion och returnerar uppskattningen eller None.
+    """
+    config = current_app.config
+    today = today or date.today()
+    end = today - timedelta(days=1)
+    start = end - timedelta(weeks=config['ENERGY_BALANCE_WEEKS']) + timedelta(days=1)
+
+    intake, burn, trend = load_daily_series(user.id, start, end)
+    estimate = estimate_maintenance(
+        intake, burn, trend,
+        kcal_per_kg=config['KCAL_PER_KG'],
+        min_days=config['ENERGY_BALANCE_MIN_DAYS'],
+    )
+    if estimate is not None:
+        user.maintenance_calories = estimate['maintenance_calories']
+        user.calorie_goal = calorie_goal_for(
+            estimate['maintenance_calories'], user.weekly_weight_goal, config['KCAL_PER_KG']
+        )
+        estimate['calorie_goal'] = user.calorie_goal
+    elif user.maintenance_calories is not None:
+        # Behåll tidigare uppskattning men låt målet följa ett ändrat viktmål
+        user.calorie_goal = calorie_goal_for(
+            user.maintenance_calories, user.weekly_weight_goal, config['KCAL_PER_KG']
+        )
+    user.energy_balance_date = today
+    return estimate
+
+def update_all(today=None):
+    """Räknar om för alla användare, t.ex. från ett schemalagt jobb. Returnerar {user_id: uppskattning}."""
+    results = {}
+    for user in db.session.scalars(db.select(User)):
+        results[user.id] = update_user(user, today)
+    db.session.commit()
+    return results
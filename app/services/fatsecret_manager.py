@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class FatSecretTokenManager:
+    """Håller en process-gemensam OAuth-token för FatSecret och förnyar den strax innan den går ut."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def _is_valid(self, refresh_margin):
+        return self._token is not None and time.monotonic() < self._expires_at - refresh_margin
+
+    def get_token(self, fetch_token, refresh_margin=60):
+        """
+        Returnerar en giltig token. `fetch_token` anropas bara när token saknas eller
+        snart går ut och ska returnera (access_token, expires_in) eller None.
+        """
+        if self._is_valid(refresh_margin):
+            return self._token
+
+        with self._lock:
+            # En annan tråd kan ha hunnit förnya token medan vi väntade på låset
+            if self._is_valid(refresh_margin):
+                return self._token
+
+            result = fetch_token()
+            if result is None:
+                return None
+
+            token, expires_in = result
+            self._token = token
+            self._expires_at = time.monotonic() + expires_in
+            return token
+
+    def invalidate(self):
+        """Glömmer nuvarande token, t.ex. efter ett 401-svar från API:t."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+
+# En instans per process (gunicorn-worker), delas mellan alla trådar
+token_manager = FatSecretTokenManager()
+
+
+class FatSecretSessionManager:
+    """Håller en delad requests.Session med connection pool för all FatSecret-trafik."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def _build_session(self, config):
+        retry = Retry(
+            total=config['FATSECRET_MAX_RETRIES'],
+            backoff_factor=config['FATSECRET_RETRY_BACKOFF'],
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'POST']),
+            # Retry-After kan vara godtyckligt lång och skulle blockera requesttråden; backoff räcker
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config['FATSECRET_POOL_CONNECTIONS'],
+            pool_maxsize=config['FATSECRET_POOL_MAXSIZE'],
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get_session(self, config):
+        """Returnerar processens session och skapar en ny efter fork så att workers inte delar sockets."""
+        pid = os.getpid()
+        if self._session is not None and self._pid == pid:
+            return self._session
+
+        with self._lock:
+            if self._session is None or self._pid != pid:
+                self._session = self._build_session(config)
+                self._pid = pid
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+# En session per worker-process, trådsäker för samtidiga anrop
+session_manager = FatSecretSessionManager()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Samordnar identiska anrop inom en process: första tråden för en nyckel gör
+    anropet och övriga trådar väntar och får samma resultat.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+# Pågående FatSecret-sökningar i denna process
+search_flight = SingleFlight()
@@ -1,8 +1,19 @@
 import requests
 from flask import current_app
+from app.services.fatsecret_manager import token_manager, session_manager, search_flight
+from app.services import food_cache
+from app.services import suggest_service
+from app.instrumentation import timed_upstream
 
-def get_fatsecret_token():
-    """Hämtar en Oauth 2.0 access token från FatSecret API."""
+def _get_session():
+    return session_manager.get_session(current_app.config)
+
+def _get_timeout():
+    """Separata timeouts för anslutning och läsning, (connect, read)."""
+    return (current_app.config['FATSECRET_CONNECT_TIMEOUT'], current_app.config['FATSECRET_READ_TIMEOUT'])
+
+def _request_fatsecret_token():
+    """Hämtar en ny Oauth 2.0 access token från FatSecret API. Returnerar (token, expires_in)."""
     client_id = current_app.config['FATSECRET_CLIENT_ID']
     client_secret = current_app.config['FATSECRET_CLIENT_SECRET']
     
@@ -10,40 +21,99 @@ def get_fatsecret_token():
         current_app.logger.error("FatSecret client ID eller secret är inte konfigurerad.")
         return None
 
-    token_url = 'https://oauth.fatsecret.com/connect/token'
+    token_url = current_app.config['FATSECRET_TOKEN_URL']
     payload = {
         'grant_type': 'client_credentials',
         'scope': 'basic'
     }
     
     try:
-        response = requests.post(token_url, data=payload, auth=(client_id, client_secret), timeout=10)
+        with timed_upstream():
+            response = _get_session().post(token_url, data=payload, auth=(client_id, client_secret), timeout=_get_timeout())
         response.raise_for_status()  # Kasta ett undantag för 4xx/5xx-svar
-        return response.json().get('access_token')
+        token_data = response.json()
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Kunde inte hämta FatSecret-token: {e}")
         return None
 
-def search_food(search_term, token):
-    """Söker efter matvaror med FatSecret API."""
+    access_token = token_data.get('access_token')
+    if not access_token:
+        return None
+    # FatSecret anger livslängden i sekunder (normalt 86400)
+    return access_token, float(token_data.get('expires_in', 3600))
+
+def get_fatsecret_token():
+    """Returnerar en cachad Oauth 2.0 access token och hämtar en ny först när den snart går ut."""
+    refresh_margin = current_app.config['FATSECRET_TOKEN_REFRESH_MARGIN']
+    return token_manager.get_token(_request_fatsecret_token, refresh_margin=refresh_margin)
+
+def search_food(search_term, token, max_results=20):
+    """Söker efter matvaror med FatSecret API. Svar cachas per normaliserad sökterm."""
+    cache = food_cache.get_cache()
+    cache_key = food_cache.make_cache_key(search_term, max_results)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     if not token:
         return None
 
-    search_url = 'https://platform.fatsecret.com/rest/server.api'
+    # Identiska sökningar som redan pågår i processen delar på ett enda anrop
+    return search_flight.do(
+        cache_key,
+        lambda: _search_food_coalesced(cache, cache_key, search_term, token, max_results)
+    )
+
+def _search_food_coalesced(cache, cache_key, search_term, token, max_results):
+    """Hämtar från FatSecret, men låter bara en worker åt gången göra anropet för samma nyckel."""
+    # En tidigare ledare kan ha hunnit fylla cachen sedan första kontrollen
+    cached = cache.get(cache_key, record_stats=False)
+    if cached is not None:
+        return cached
+
+    if cache.try_lock(cache_key, current_app.config['FOOD_SEARCH_LOCK_LEASE']):
+        try:
+            return _fetch_and_cache(cache, cache_key, search_term, token, max_results)
+        finally:
+            cache.release_lock(cache_key)
+
+    shared = cache.wait_for(cache_key, current_app.config['FOOD_SEARCH_LOCK_WAIT'])
+    if shared is not None:
+        return shared
+    # Den andra workern gav inget svar i tid, hämta själv
+    return _fetch_and_cache(cache, cache_key, search_term, token, max_results)
+
+def _fetch_and_cache(cache, cache_key, search_term, token, max_results):
+    search_data = _search_food_upstream(search_term, token, max_results)
+    if search_data is not None and 'error' not in search_data:
+        # Tomma svar cachas kortare så att nya livsmedel i FatSecret syns snabbare
+        has_results = 'foods' in search_data and 'food' in search_data['foods']
+        ttl = None if has_results else current_app.config['FOOD_CACHE_EMPTY_TTL']
+        cache.set(cache_key, search_data, ttl=ttl)
+        if has_results:
+            suggest_service.remember_fatsecret_foods(search_data['foods']['food'])
+    return search_data
+
+def _search_food_upstream(search_term, token, max_results):
+    search_url = current_app.config['FATSECRET_API_URL']
     params = {
         'method': 'foods.search',
         'search_expression': search_term,
         'format': 'json',
-        'max_results': 20
+        'max_results': max_results
     }
     headers = {
         'Authorization': f'Bearer {token}'
     }
 
     try:
-        response = requests.get(search_url, params=params, headers=headers, timeout=10)
+        with timed_upstream():
+            response = _get_session().get(search_url, params=params, headers=headers, timeout=_get_timeout())
+        if response.status_code == 401:
+            # Token har återkallats i förtid, nästa anrop hämtar en ny
+            token_manager.invalidate()
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Kunde inte söka efter mat: {e}")
-        return None 
\ No newline at end of file
+        return None
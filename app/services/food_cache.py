@@ -0,0 +1,256 @@
+import json
+import os
+import uuid
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+def normalize_search_term(search_term):
+    """Normaliserar en sökterm så att 'Ägg ', 'ägg' och 'ÄGG' delar cachepost."""
+    return ' '.join(search_term.split()).casefold()
+
+def make_cache_key(search_term, max_results):
+    return f"{normalize_search_term(search_term)}|{max_results}"
+
+
+class SQLiteCacheTier:
+    """Persistent cachenivå i en egen SQLite-fil som delas mellan alla gunicorn-workers."""
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self):
+        # En anslutning per tråd och process; sqlite3-anslutningar får inte delas över fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS food_search_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS food_search_lock ('
+            ' key TEXT PRIMARY KEY,'
+            ' owner TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM food_search_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        value, expires_at = row
+        if expires_at <= time.time():
+            return None, None
+        return json.loads(value), expires_at
+
+    def set(self, key, value, expires_at):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO food_search_cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), expires_at)
+        )
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM food_search_cache WHERE key = ?', (key,))
+
+    def try_lock(self, key, owner, lease):
+        """Tar ett lås för nyckeln mellan processer. Ett övergivet lås går ut efter `lease` sekunder."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('DELETE FROM food_search_lock WHERE key = ? AND expires_at <= ?', (key, now))
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO food_search_lock (key, owner, expires_at) VALUES (?, ?, ?)',
+            (key, owner, now + lease)
+        )
+        return cursor.rowcount == 1
+
+    def release_lock(self, key, owner):
+        self._connect().execute('DELETE FROM food_search_lock WHERE key = ? AND owner = ?', (key, owner))
+
+    def is_locked(self, key):
+        row = self._connect().execute(
+            'SELECT 1 FROM food_search_lock WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def iter_values(self):
+        rows = self._connect().execute(
+            'SELECT value FROM food_search_cache WHERE expires_at > ?', (time.time(),)
+        ).fetchall()
+        for (value,) in rows:
+            yield json.loads(value)
+
+    def purge_expired(self):
+        cursor = self._connect().execute('DELETE FROM food_search_cache WHERE expires_at <= ?', (time.time(),))
+        return cursor.rowcount
+
+    def clear(self):
+        self._connect().execute('DELETE FROM food_search_cache')
+
+
+class FoodSearchCache:
+    """
+    Tvånivåcache för FatSecret-sökningar: en begränsad LRU i minnet framför en
+    valfri SQLite-nivå. Varje post har en egen utgångstid.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=86400, sqlite_path=None):
+        self.owner_id = uuid.uuid4().hex
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.persistent = SQLiteCacheTier(sqlite_path) if sqlite_path else None
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+
+    def get(self, key, record_stats=True):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    if record_stats:
+                        self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.persistent is not None:
+            try:
+                value, expires_at = self.persistent.get(key)
+            except sqlite3.Error as e:
+                current_app.logger.warning(f"Kunde inte läsa från sökcachen: {e}")
+                value = None
+            if value is not None:
+                self._store_in_memory(key, value, expires_at)
+                if record_stats:
+                    with self._lock:
+                        self.hits += 1
+                        self.persistent_hits += 1
+                return value
+
+        if record_stats:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        self._store_in_memory(key, value, expires_at)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                current_app.logger.warning(f"Kunde inte skriva till sökcachen: {e}")
+
+    def _store_in_memory(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def try_lock(self, key, lease):
+        """
+        Försöker bli den worker som hämtar nyckeln från FatSecret. Utan SQLite-nivå
+        finns inget delat lås och anroparen får alltid fortsätta.
+        """
+        if self.persistent is None:
+            return True
+        try:
+            return self.persistent.try_lock(key, f"{self.owner_id}:{os.getpid()}", lease)
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Kunde inte ta lås i sökcachen: {e}")
+            return True
+
+    def release_lock(self, key):
+        if self.persistent is None:
+            return
+        try:
+            self.persistent.release_lock(key, f"{self.owner_id}:{os.getpid()}")
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Kunde inte släppa lås i sökcachen: {e}")
+
+    def wait_for(self, key, timeout, poll_interval=0.05):
+        """Väntar på att en annan worker fyller i nyckeln. Returnerar None vid timeout eller om låset släpps utan svar."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            value = self.get(key, record_stats=False)
+            if value is not None:
+                return value
+            try:
+                if not self.persistent.is_locked(key):
+                    return self.get(key, record_stats=False)
+            except sqlite3.Error:
+                return None
+            time.sleep(poll_interval)
+        return None
+
+    def iter_values(self):
+        """Alla giltiga värden, från den persistenta nivån om den finns, annars från minnet."""
+        if self.persistent is not None:
+            try:
+                yield from self.persistent.iter_values()
+                return
+            except sqlite3.Error as e:
+                current_app.logger.warning(f"Kunde inte läsa från sökcachen: {e}")
+        now = time.time()
+        with self._lock:
+            values = [value for value, expires_at in self._entries.values() if expires_at > now]
+        yield from values
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def init_app(app):
+    """Skapar sökcachen för appen utifrån konfigurationen."""
+    app.extensions['food_search_cache'] = FoodSearchCache(
+        max_entries=app.config['FOOD_CACHE_MAX_ENTRIES'],
+        default_ttl=app.config['FOOD_CACHE_TTL'],
+        sqlite_path=app.config['FOOD_CACHE_SQLITE_PATH'],
+    )
+
+def get_cache():
+    return current_app.extensions['food_search_cache']
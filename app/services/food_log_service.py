@@ -0,0 +1,181 @@
+import math
+from datetime import date
+from app import db
+from app.models import FoodLog, Recipe, RecipeIngredient
+from app.services import nutrition_parser
+from app.services import nutrition_summary_service
+
+MEAL_TYPES = ('Frukost', 'Lunch', 'Middag', 'Mellanmål')
+MAX_ITEMS_PER_REQUEST = 100
+
+
+class FoodLogError(ValueError):
+    """Ogiltig inmatning vid loggning. Meddelandet kan visas för användaren."""
+
+
+def _parse_date(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise FoodLogError(f"Ogiltigt datum: {value}")
+
+def _check_meal_type(meal_type):
+    if meal_type not in MEAL_TYPES:
+        raise FoodLogError(f"Okänd måltid: {meal_type}")
+    return meal_type
+
+def scale_item(item):
+    """
+    Skalar en post från sökresultaten (food_name, food_id, food_description och
+    grams eller servings) till näringsvärden. Med `servings` räknas antalet
+    portioner av basen, t.ex. 2 × "Per 1 cup", så att även portioner utan känd
+    vikt går att logga; gram blir då 0 om vikten inte går att avgöra.
+    Returnerar (gram, näringsvärden, portionstext).
+    """
+    if not isinstance(item, dict):
+        raise FoodLogError("Varje livsmedel måste vara ett objekt.")
+    food_name = item.get('food_name')
+    if not food_name:
+        raise FoodLogError("Livsmedlet saknar namn.")
+
+    nutrients = nutrition_parser.parse_food(item.get('food_id'), item.get('food_description'))
+    if nutrients is None:
+        raise FoodLogError(f"Kunde inte läsa näringsvärden för {food_name}.")
+
+    servings = item.get('servings')
+    if servings not in (None, ''):
+        try:
+            servings = float(servings)
+        except (TypeError, ValueError):
+            raise FoodLogError(f"Ogiltigt antal portioner för {food_name}.")
+        if not math.isfinite(servings) or servings <= 0:
+            raise FoodLogError(f"Antal portioner måste vara större än noll för {food_name}.")
+        grams = round(servings * nutrients.serving_grams) if nutrients.is_scalable else 0
+        return grams, nutrients.for_servings(servings), f"{servings:g} × {nutrients.serving}"[:200]
+
+    try:
+        grams = int(item.get('grams', 100))
+    except (TypeError, ValueError):
+        raise FoodLogError(f"Ogiltigt antal gram för {food_name}.")
+    if grams <= 0:
+        raise FoodLogError(f"Antal gram måste vara större än noll för {food_name}.")
+    scaled = nutrients.scaled_to(grams)
+    if scaled is None:
+        raise FoodLogError(f"Kan inte räkna om '{nutrients.serving}' till gram för {food_name}, ange antal portioner.")
+    return grams, scaled, nutrients.serving
+
+def build_food_log_row(user_id, item, meal_type=None, day=None):
+    """Gör om en post från sökresultaten till en rad för FoodLog-tabellen, se scale_item."""
+    grams, scaled, serving = scale_item(item)
+    return {
+        'user_id': user_id,
+        'date': _parse_date(item.get('date'), day or date.today()),
+        'meal_type': _check_meal_type(item.get('meal_type') or meal_type),
+        'food_name': item['food_name'],
+        'grams': grams,
+        'calories': scaled['calories'],
+        'fat': scaled['fat'],
+        'carbohydrates': scaled['carbohydrates'],
+        'protein': scaled['protein'],
+        'base_servings_info': serving,
+    }
+
+def build_recipe_ingredient(item):
+    """
+    Ingrediens för receptbyggaren. Poster med food_description räknas om här
+    (gram eller portioner som i scale_item); äldre klienter skickar färdiga värden.
+    """
+    if isinstance(item, dict) and item.get('food_description'):
+        grams, scaled, _ = scale_item(item)
+        return {'food_name': item['food_name'], 'grams': grams, **scaled}
+    if not isinstance(item, dict) or not item.get('food_name'):
+        raise FoodLogError("Varje ingrediens måste ha ett namn.")
+    try:
+        return {
+            'food_name': item['food_name'],
+            'grams': int(item['grams']),
+            **{column: float(item[column]) for column in ('calories', 'protein', 'carbohydrates', 'fat')},
+        }
+    except (KeyError, TypeError, ValueError):
+        raise FoodLogError(f"Ofullständiga näringsvärden för {item['food_name']}.")
+
+def log_items(user_id, items, meal_type=None, day=None):
+    """
+    Loggar flera livsmedel med en executemany och uppdaterar dagssummeringen.
+    Allt valideras innan något skrivs. Körs i anroparens transaktion och
+    returnerar de infogade raderna.
+    """
+    if not items:
+        raise FoodLogError("Inga livsmedel att logga.")
+    if len(items) > MAX_ITEMS_PER_REQUEST:
+        raise FoodLogError(f"Högst {MAX_ITEMS_PER_REQUEST} livsmedel per anrop.")
+
+    day = _parse_date(day, date.today())
+    rows = [build_food_log_row(user_id, item, meal_type, day) for item in items]
+    db.session.execute(db.insert(FoodLog), rows)
+    nutrition_summary_service.apply_food_logs(rows, sign=1)
+    return rows
+
+def log_recipe(user_id, recipe_id, meal_type, grams=None, portions=None, day=None):
+    """
+    Loggar alla ingredienser i ett recept som egna matloggar med en INSERT ... SELECT.
+    Receptet skalas antingen till en total vikt i gram eller till ett antal
+    portioner, där en portion är hela receptet som det sparades.
+    Returnerar (recept, antal loggade ingredienser, totaler).
+    """
+    recipe = db.session.scalar(db.select(Recipe).where(Recipe.id == recipe_id, Recipe.user_id == user_id))
+    if recipe is None:
+        raise FoodLogError("Receptet finns inte.")
+    _check_meal_type(meal_type)
+    day = _parse_date(day, date.today())
+
+    # Summorna underhålls på receptet (recipe_service), så ingredienserna behöver inte läsas här
+    if not recipe.ingredient_count:
+        raise FoodLogError(f"Receptet '{recipe.name}' har inga ingredienser.")
+
+    if grams is not None:
+        if not math.isfinite(grams) or grams <= 0 or not recipe.total_grams:
+            raise FoodLogError("Antal gram måste vara större än noll.")
+        factor = grams / recipe.total_grams
+    else:
+        portions = 1 if portions is None else portions
+        if not math.isfinite(portions) or portions <= 0:
+            raise FoodLogError("Antal portioner måste vara större än noll.")
+        factor = float(portions)
+
+    factor_param = db.literal(factor, db.Float)
+    ingredients = db.select(
+        db.literal(user_id),
+        db.literal(day, db.Date),
+        db.literal(meal_type),
+        RecipeIngredient.food_name,
+        db.cast(db.func.round(RecipeIngredient.grams * factor_param), db.Integer),
+        RecipeIngredient.calories * factor_param,
+        RecipeIngredient.protein * factor_param,
+        RecipeIngredient.carbohydrates * factor_param,
+        RecipeIngredient.fat * factor_param,
+        db.literal(f"Recept: {recipe.name}"[:200]),
+    ).where(RecipeIngredient.recipe_id == recipe.id).order_by(RecipeIngredient.id)
+    db.session.execute(
+        db.insert(FoodLog).from_select(
+            ['user_id', 'date', 'meal_type', 'food_name', 'grams', 'calories',
+             'protein', 'carbohydrates', 'fat', 'base_servings_info'],
+            ingredients
+        )
+    )
+
+    # Summeringen uppdateras med receptets totaler i ett steg i stället för per rad
+    scaled = {
+        column: getattr(recipe, f"total_{column}") * factor
+        for column in nutrition_summary_service.SUMMARY_COLUMNS
+    }
+    nutrition_summary_service.apply_food_logs(
+        [{'user_id': user_id, 'date': day, 'meal_type': meal_type, 'item_count': recipe.ingredient_count, **scaled}],
+        sign=1
+    )
+
+    return recipe, recipe.ingredient_count, scaled | {'grams': recipe.total_grams * factor}
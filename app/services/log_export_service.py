@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+import zlib
+from app import db
+from app.database import reads
+from app.models import Recipe, RecipeIngredient
+from app.services.log_import_service import TABLES
+
+FORMATS = ('ndjson', 'csv')
+EXPORT_TABLES = tuple(TABLES) + ('recipes',)
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+RECIPE_COLUMNS = ('recipe_id', 'recipe_name', 'food_name', 'grams', 'calories', 'protein', 'carbohydrates', 'fat')
+# Ungefärlig storlek på bitarna som skickas till klienten
+FLUSH_BYTES = 64 * 1024
+
+
+def _json_default(value):
+    # Datum är de enda värdena som json inte klarar själv
+    return value.isoformat()
+
+def _log_rows(name, user_id, start, end, yield_per):
+    """
+    Rader för en loggtabell som dicts med samma fält som importen förväntar
+    sig, så att en export kan läsas in igen. Kolumnfrågan strömmas med yield_per
+    (serversidig cursor i PostgreSQL) i stället för att ladda ORM-objekt.
+    """
+    table = TABLES[name]
+    model = table.model
+    columns = [getattr(model, column) for column in table.fields]
+    query = db.select(model.user_id, *columns).order_by(model.user_id, model.date, model.id)
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+    if start is not None:
+        query = query.where(model.date >= start)
+    if end is not None:
+        query = query.where(model.date <= end)
+
+    keys = ('user_id',) + tuple(table.fields)
+    for row in reads.execute(query.execution_options(yield_per=yield_per)):
+        yield dict(zip(keys, row))
+
+def _recipe_rows(user_id, yield_per):
+    """En rad per ingrediens, sorterat per recept. Recept utan ingredienser får en tom rad."""
+    query = (
+        db.select(
+            Recipe.user_id, Recipe.id, Recipe.name, RecipeIngredient.food_name, RecipeIngredient.grams,
+            RecipeIngredient.calories, RecipeIngredient.protein, RecipeIngredient.carbohydrates,
+            RecipeIngredient.fat,
+        )
+        .outerjoin(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id)
+        .order_by(Recipe.user_id, Recipe.id, RecipeIngredient.id)
+    )
+    if user_id is not None:
+        query = query.where(Recipe.user_id == user_id)
+    keys = ('user_id',) + RECIPE_COLUMNS
+    for row in reads.execute(query.execution_options(yield_per=yield_per)):
+        yield dict(zip(keys, row))
+
+def _grouped_recipes(rows):
+    """Slår ihop ingrediensraderna till ett objekt per recept (för NDJSON)."""
+    current = None
+    for row in rows:
+        if current is None or current['id'] != row['recipe_id']:
+            if current is not None:
+                yield current
+            current = {'user_id': row['user_id'], 'id': row['recipe_id'], 'name': row['recipe_name'], 'ingredients': []}
+        if row['food_name'] is not None:
+            current['ingredients'].append({column: row[column] for column in RECIPE_COLUMNS[2:]})
+    if current is not None:
+        yield current
+
+
+def _ndjson_lines(tables, user_id, start, end, yield_per):
+    for name in tables:
+        if name == 'recipes':
+            records = _grouped_recipes(_recipe_rows(user_id, yield_per))
+        else:
+            records = _log_rows(name, user_id, start, end, yield_per)
+        for record in records:
+            if user_id is not None:
+                del record['user_id']
+            record = {'table': name, **record}
+            yield json.dumps(record, ensure_ascii=False, default=_json_default) + '\n'
+
+def _csv_lines(name, user_id, start, end, yield_per):
+    """
+    CSV för en enda tabell med dess egna kolumner. Loggtabeller får även en
+    kolumn 'table', så att filen kan importeras igen utan --table.
+    """
+    if name == 'recipes':
+        header = list(RECIPE_COLUMNS)
+    else:
+        header = ['table', *TABLES[name].fields]
+    if user_id is None:
+        header.insert(0, 'user_id')
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, header, extrasaction='ignore', lineterminator='\n')
+
+    def take():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield take()
+    if name == 'recipes':
+        records = _recipe_rows(user_id, yield_per)
+    else:
+        records = _log_rows(name, user_id, start, end, yield_per)
+    for record in records:
+        record['table'] = name
+        writer.writerow(record)
+        yield take()
+
+def _chunked(lines):
+    """Samlar rader till bitar om ungefär FLUSH_BYTES så att varje write blir rimligt stor."""
+    parts = []
+    size = 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip-huvud
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_tables(value):
+    """'weight,food' -> ('weight', 'food'). Tomt eller None ger None, dvs. alla tabeller."""
+    if not value:
+        return None
+    tables = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in tables if name not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f"Okänd tabell: {', '.join(unknown)}")
+    return tables
+
+def export_chunks(user_id, tables=None, file_format='ndjson', start=None, end=None,
+                  compress=False, yield_per=1000):
+    """
+    Exporterar loggar som en generator av bytes-bitar, utan att bygga listor i
+    minnet. `user_id=None` exporterar alla användare med en user_id-kolumn.
+    Datumfiltret gäller loggtabellerna; recept har inget datum och tas med hela.
+    Utan `tables` exporteras allt som NDJSON; CSV kräver exakt en tabell
+    eftersom tabellerna har olika kolumner. Valideringen sker direkt så att
+    fel kan rapporteras innan svaret börjar.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Okänt format: {file_format}")
+    if file_format == 'csv':
+        if not tables or len(tables) != 1:
+            raise ValueError("CSV kräver exakt en tabell, t.ex. table=weight. Använd NDJSON för flera tabeller.")
+        lines = _csv_lines(tables[0], user_id, start, end, yield_per)
+    else:
+        lines = _ndjson_lines(tables or EXPORT_TABLES, user_id, start, end, yield_per)
+    chunks = _chunked(lines)
+    return _gzipped(chunks) if compress else chunks
+
+def export_filename(file_format, compress, today, tables=None):
+    # En CSV innehåller bara en tabell, så den syns i filnamnet
+    table = f"{tables[0]}-" if file_format == 'csv' and tables else ''
+    return f"health-macro-export-{table}{today.isoformat()}.{file_format}" + ('.gz' if compress else '')
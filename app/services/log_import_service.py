@@ -0,0 +1,474 @@
+import csv
+import io
+import itertools
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from app import db
+from app.models import User, WeightLog, StepLog, FoodLog, CardioLog, FightRondLog
+from app.services import nutrition_summary_service
+from app.services import data_version
+from app.services.sql_helpers import upsert
+
+FORMATS = ('json', 'ndjson', 'csv')
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportFormatError(ValueError):
+    """Filen går inte att tolka alls (till skillnad från enskilda ogiltiga rader)."""
+
+
+# --- Validering av fält ---
+
+def _date(value):
+    if isinstance(value, date):
+        return value
+    # Tillåt tidsstämplar som '2024-05-01T07:30:00'
+    return date.fromisoformat(str(value).strip()[:10])
+
+def _float(value):
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
+    return float(value)
+
+def _int(value):
+    return int(round(_float(value)))
+
+def _str(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError('tom sträng')
+    return value
+
+
+@dataclass(frozen=True)
+class Field:
+    convert: object
+    required: bool = True
+    default: object = None
+
+
+@dataclass(frozen=True)
+class ImportTable:
+    """Hur rader för en loggtabell valideras och skrivs."""
+    model: object
+    fields: dict
+    # Tabeller med en rad per användare och dag skrivs med ON CONFLICT; i övriga
+    # hoppas rader som redan finns över (eller ersätts hela datum, se LogImporter)
+    unique_per_day: bool = False
+
+    def build_row(self, user_id, raw):
+        row = {'user_id': user_id}
+        for name, field in self.fields.items():
+            value = raw.get(name)
+            if value is None or value == '':
+                if field.required:
+                    raise ValueError(f"saknar '{name}'")
+                row[name] = field.default
+                continue
+            try:
+                row[name] = field.convert(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"ogiltigt värde för '{name}': {value!r}")
+        return row
+
+
+TABLES = {
+    'weight': ImportTable(WeightLog, {
+        'date': Field(_date),
+        'weight': Field(_float),
+    }, unique_per_day=True),
+    'steps': ImportTable(StepLog, {
+        'date': Field(_date),
+        'steps': Field(_int),
+    }, unique_per_day=True),
+    'food': ImportTable(FoodLog, {
+        'date': Field(_date),
+        'meal_type': Field(_str),
+        'food_name': Field(_str),
+        'grams': Field(_int, required=False, default=100),
+        'calories': Field(_float),
+        'protein': Field(_float, required=False),
+        'carbohydrates': Field(_float, required=False),
+        'fat': Field(_float, required=False),
+        'base_servings_info': Field(_str, required=False),
+    }),
+    'cardio': ImportTable(CardioLog, {
+        'date': Field(_date),
+        'duration_seconds': Field(_int),
+        'avg_bpm': Field(_int),
+        'calories_burned': Field(_int),
+        'distance_km': Field(_float, required=False),
+    }),
+    'fight_rond': ImportTable(FightRondLog, {
+        'date': Field(_date),
+        'bpm': Field(_int),
+        'calories_burned': Field(_int),
+    }),
+}
+
+# Namn som förekommer i äldre exporter, t.ex. user_data.json
+TABLE_ALIASES = {
+    'weight_log': 'weight',
+    'weight_logs': 'weight',
+    'step_log': 'steps',
+    'steps_log': 'steps',
+    'food_log': 'food',
+    'food_logs': 'food',
+    'cardio_log': 'cardio',
+    'fight_rond_log': 'fight_rond',
+}
+
+def resolve_table(name):
+    if name is None:
+        return None
+    name = str(name).strip().lower()
+    name = TABLE_ALIASES.get(name, name)
+    return name if name in TABLES else None
+
+
+# --- Inkrementell läsning ---
+
+class _JSONStream:
+    """
+    Minimal strömmande JSON-läsare. Läser filen i bitar och avkodar ett
+    arrayelement i taget med raw_decode, så att minnet bara behöver rymma
+    det största enskilda elementet.
+    """
+
+    def __init__(self, stream, chunk_size=1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Nästa tecken som inte är blanktecken, eller '' vid filslut."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ImportFormatError(f"Ogiltig JSON: förväntade '{char}'")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Ett tal i slutet av bufferten kan fortsätta i nästa bit
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ImportFormatError(f"Ogiltig JSON: {e.msg}")
+            self._fill()
+
+    def iter_array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ImportFormatError("Ogiltig JSON: förväntade ',' eller ']'")
+
+def read_json(stream, default_table=None, ignored_keys=None):
+    """
+    Läser antingen en lista med poster eller ett objekt där varje nyckel är en
+    tabell med en lista, som i user_data.json. Övriga nycklar (t.ex. 'profile')
+    hoppas över och läggs i `ignored_keys`.
+    """
+    reader = _JSONStream(stream)
+    first = reader.peek()
+    if first == '[':
+        for item in reader.iter_array():
+            yield default_table, item
+        return
+    if first != '{':
+        raise ImportFormatError("JSON-filen måste innehålla ett objekt eller en lista")
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ImportFormatError("Ogiltig JSON: nyckel saknas")
+        reader.expect(':')
+        table = resolve_table(key)
+        if reader.peek() == '[':
+            for item in reader.iter_array():
+                if table is not None:
+                    yield table, item
+            if table is None and ignored_keys is not None:
+                ignored_keys.append(key)
+        else:
+            reader.value()
+            if ignored_keys is not None:
+                ignored_keys.append(key)
+        char = reader.peek()
+        reader.pos += 1
+        if char == '}':
+            return
+        if char != ',':
+            raise ImportFormatError("Ogiltig JSON: förväntade ',' eller '}'")
+
+def read_ndjson(stream, default_table=None):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield default_table, json.loads(line)
+        except json.JSONDecodeError as e:
+            # En trasig rad ska inte stoppa resten av importen
+            yield default_table, _InvalidRecord(f"rad {line_number}: ogiltig JSON ({e.msg})")
+
+def read_csv(stream, default_table=None, delimiter=None):
+    lines = stream
+    if delimiter is None:
+        # Läs provet till radslut och sätt ihop det med resten, så fungerar även strömmar utan seek
+        sample = stream.read(4096) + stream.readline()
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+        except csv.Error:
+            delimiter = ','
+        lines = itertools.chain(io.StringIO(sample), stream)
+    for row in csv.DictReader(lines, delimiter=delimiter):
+        yield default_table, row
+
+def guess_format(filename):
+    lowered = filename.lower()
+    if lowered.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith('.json'):
+        return 'json'
+    raise ImportFormatError(f"Kan inte avgöra formatet för {filename}, ange det uttryckligen")
+
+def read_records(stream, file_format, default_table=None, ignored_keys=None, delimiter=None):
+    if file_format == 'json':
+        return read_json(stream, default_table, ignored_keys)
+    if file_format == 'ndjson':
+        return read_ndjson(stream, default_table)
+    if file_format == 'csv':
+        return read_csv(stream, default_table, delimiter)
+    raise ImportFormatError(f"Okänt format: {file_format}")
+
+
+class _InvalidRecord:
+    def __init__(self, message):
+        self.message = message
+
+
+# --- Skrivning ---
+
+class LogImporter:
+    """
+    Validerar poster och skriver dem i batcher, en transaktion per batch.
+    Dagunika tabeller (vikt, steg) skrivs med ON CONFLICT så att senaste värdet
+    vinner. För övriga hoppas importerade rader som är identiska med en befintlig
+    rad över, medan andra rader samma dag lämnas orörda. Med `replace_dates`
+    ersätts i stället alla användarens rader för varje importerat datum.
+    Att importera samma fil två gånger ger i båda fallen samma resultat.
+    Matloggarna förs in i dagssummeringen i samma transaktion som batchen.
+    """
+
+    def __init__(self, user_id, batch_size=5000, replace_dates=False):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.replace_dates = replace_dates
+        self._pending = {name: {} if table.unique_per_day else [] for name, table in TABLES.items()}
+        self._pending_count = 0
+        self._seen_dates = {name: set() for name, table in TABLES.items() if not table.unique_per_day}
+        # Befintliga rader per tabell som multimängd, så att en rad i filen matchar högst en rad i databasen
+        self._existing = {name: Counter() for name, table in TABLES.items() if not table.unique_per_day}
+        self.imported = {name: 0 for name in TABLES}
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = []
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def _reject(self, record_number, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"post {record_number}: {message}")
+
+    def add(self, record_number, table_name, raw):
+        if isinstance(raw, _InvalidRecord):
+            self._reject(record_number, raw.message)
+            return
+        if not isinstance(raw, dict):
+            self._reject(record_number, "posten är inte ett objekt")
+            return
+        name = resolve_table(raw.get('table') or table_name)
+        if name is None:
+            self._reject(record_number, "okänd eller saknad tabell")
+            return
+        try:
+            row = TABLES[name].build_row(self.user_id, raw)
+        except ValueError as e:
+            self._reject(record_number, str(e))
+            return
+
+        pending = self._pending[name]
+        if TABLES[name].unique_per_day:
+            # Dubbletter inom batchen: senaste raden vinner
+            if row['date'] not in pending:
+                self._pending_count += 1
+            pending[row['date']] = row
+        else:
+            pending.append(row)
+            self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending_count:
+            return
+        try:
+            for name, table in TABLES.items():
+                pending = self._pending[name]
+                if not pending:
+                    continue
+                if table.unique_per_day:
+                    rows = list(pending.values())
+                    value_columns = [column for column in table.fields if column != 'date']
+                    stmt = upsert(table.model, index_elements=['user_id', 'date'], update_columns=value_columns)
+                    db.session.execute(stmt, rows)
+                else:
+                    new_dates = {row['date'] for row in pending} - self._seen_dates[name]
+                    self._seen_dates[name] |= new_dates
+                    if self.replace_dates:
+                        rows = pending
+                        if new_dates:
+                            self._delete_dates(table, new_dates)
+                    else:
+                        if new_dates:
+                            self._load_existing(name, table, new_dates)
+                        rows = self._without_existing(name, table, pending)
+                    if not rows:
+                        continue
+                    db.session.execute(db.insert(table.model), rows)
+                    if table.model is FoodLog:
+                        nutrition_summary_service.apply_food_logs(rows, sign=1)
+                self.imported[name] += len(rows)
+            # Summering och dataversion följer med varje batch, så att ett avbrott inte lämnar dem inaktuella
+            data_version.bump(self.user_id)
+            # Ny historik ger en ny uppskattning av energibalansen
+            db.session.execute(
+                db.update(User)
+                .where(User.id == self.user_id)
+                .values(energy_balance_date=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.batches += 1
+        self._pending = {name: {} if table.unique_per_day else [] for name, table in TABLES.items()}
+        self._pending_count = 0
+
+    def _delete_dates(self, table, dates):
+        if table.model is FoodLog:
+            removed = nutrition_summary_service.logged_totals(self.user_id, dates)
+            nutrition_summary_service.apply_food_logs(removed, sign=-1)
+        db.session.execute(
+            db.delete(table.model).where(
+                table.model.user_id == self.user_id,
+                table.model.date.in_(sorted(dates))
+            )
+        )
+
+    def _load_existing(self, name, table, dates):
+        columns = [getattr(table.model, column) for column in table.fields]
+        result = db.session.execute(
+            db.select(*columns).where(
+                table.model.user_id == self.user_id,
+                table.model.date.in_(sorted(dates))
+            )
+        )
+        self._existing[name].update(tuple(row) for row in result)
+
+    def _without_existing(self, name, table, rows):
+        existing = self._existing[name]
+        new_rows = []
+        for row in rows:
+            key = tuple(row[column] for column in table.fields)
+            if existing[key] > 0:
+                existing[key] -= 1
+                self.duplicates += 1
+            else:
+                new_rows.append(row)
+        return new_rows
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.imported.values())
+        return {
+            'imported': dict(self.imported),
+            'total': total,
+            'duplicates': self.duplicates,
+            'skipped': self.skipped,
+            'errors': list(self.errors),
+            'batches': self.batches,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed) if elapsed > 0 else total,
+        }
+
+
+def import_stream(user_id, stream, file_format, default_table=None, batch_size=5000, delimiter=None, progress=None,
+                  replace_dates=False):
+    """
+    Importerar loggar från en textström och returnerar en rapport. Med
+    `replace_dates` ersätts befintliga mat- och träningsloggar för importerade
+    datum i stället för att bara dubbletter hoppas över.
+    Dagssummeringen och dataversionen uppdateras i varje batch; vycachen
+    töms av anroparen. `progress` anropas med rapporten efter varje batch.
+    """
+
+    if default_table is not None and resolve_table(default_table) is None:
+        raise ImportFormatError(f"Okänd tabell: {default_table}")
+    ignored_keys = []
+    importer = LogImporter(user_id, batch_size, replace_dates)
+    records = read_records(stream, file_format, resolve_table(default_table), ignored_keys, delimiter)
+    batches = 0
+    for record_number, (table_name, raw) in enumerate(records, start=1):
+        importer.add(record_number, table_name, raw)
+        if progress is not None and importer.batches != batches:
+            batches = importer.batches
+            progress(importer.report())
+    importer.flush()
+
+    report = importer.report()
+    report['ignored_keys'] = ignored_keys
+    return report
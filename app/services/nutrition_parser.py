@@ -0,0 +1,187 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# FatSecret beskriver näringsvärden som t.ex.
+# "Per 100g - Calories: 165kcal | Fat: 3.57g | Carbs: 0.00g | Protein: 31.02g"
+# "Per 1 cup - Calories: 206kcal | Fat: 0.44g | Carbs: 44.51g | Protein: 4.25g"
+SERVING_PATTERN = re.compile(r"^\s*Per\s+(?P<amount>\d+(?:[.,]\d+)?(?:/\d+)?)?\s*(?P<unit>[^-]*?)\s*-", re.IGNORECASE)
+CALORIES_PATTERN = re.compile(r"Calories:\s*(\d+(?:[.,]\d+)?)\s*kcal", re.IGNORECASE)
+FAT_PATTERN = re.compile(r"Fat:\s*(\d+(?:[.,]\d+)?)\s*g", re.IGNORECASE)
+CARBS_PATTERN = re.compile(r"Carbs:\s*(\d+(?:[.,]\d+)?)\s*g", re.IGNORECASE)
+PROTEIN_PATTERN = re.compile(r"Protein:\s*(\d+(?:[.,]\d+)?)\s*g", re.IGNORECASE)
+
+# Enheter som kan räknas om till gram. Vätskor räknas med densitet 1 (1 ml = 1 g).
+GRAMS_PER_UNIT = {
+    'g': 1.0,
+    'gram': 1.0,
+    'grams': 1.0,
+    'kg': 1000.0,
+    'mg': 0.001,
+    'ml': 1.0,
+    'cl': 10.0,
+    'dl': 100.0,
+    'l': 1000.0,
+    'oz': 28.349523125,
+    'lb': 453.59237,
+}
+
+
+@dataclass(frozen=True)
+class Nutrients:
+    """Tolkade näringsvärden för en FatSecret-portion."""
+    serving: str                     # t.ex. "Per 100g" eller "Per 1 cup"
+    serving_grams: Optional[float]   # portionens vikt i gram om den går att avgöra
+    calories: float                  # värden per portion
+    fat: float
+    carbohydrates: float
+    protein: float
+
+    @property
+    def is_scalable(self):
+        """Om värdena kan skalas per gram. 'Per 1 cup' utan vikt går inte att skala."""
+        return self.serving_grams is not None and self.serving_grams > 0
+
+    def per_100g(self):
+        if not self.is_scalable:
+            return None
+        return self.scaled_to(100)
+
+    def scaled_to(self, grams):
+        """Näringsvärden för angivet antal gram, eller None om portionen saknar vikt."""
+        if not self.is_scalable:
+            return None
+        factor = grams / self.serving_grams
+        return {
+            'calories': self.calories * factor,
+            'fat': self.fat * factor,
+            'carbohydrates': self.carbohydrates * factor,
+            'protein': self.protein * factor,
+        }
+
+    def for_servings(self, servings):
+        """Näringsvärden för ett antal portioner av basen, t.ex. 2 × "Per 1 cup". Kräver ingen vikt."""
+        return {
+            'calories': self.calories * servings,
+            'fat': self.fat * servings,
+            'carbohydrates': self.carbohydrates * servings,
+            'protein': self.protein * servings,
+        }
+
+    def to_dict(self):
+        return {
+            'serving': self.serving,
+            'serving_grams': self.serving_grams,
+            'per_serving': {
+                'calories': self.calories,
+                'fat': self.fat,
+                'carbohydrates': self.carbohydrates,
+                'protein': self.protein,
+            },
+            'per_100g': self.per_100g(),
+        }
+
+
+def _parse_amount(amount):
+    if not amount:
+        return 1.0
+    amount = amount.replace(',', '.')
+    if '/' in amount:
+        numerator, denominator = amount.split('/')
+        if float(denominator) == 0:
+            return None
+        return float(numerator) / float(denominator)
+    return float(amount)
+
+def _serving_grams(amount, unit):
+    unit = unit.strip().lower()
+    grams_per_unit = GRAMS_PER_UNIT.get(unit)
+    amount = _parse_amount(amount)
+    if grams_per_unit is None or amount is None:
+        return None
+    return amount * grams_per_unit
+
+def _number(match):
+    return float(match.group(1).replace(',', '.')) if match else 0.0
+
+def parse_description(food_description):
+    """Tolkar en FatSecret food_description. Returnerar None om kalorier saknas eller texten är trasig."""
+    if not food_description:
+        return None
+    try:
+        return _parse_description(food_description)
+    except ValueError:
+        return None
+
+def _parse_description(food_description):
+    calories_match = CALORIES_PATTERN.search(food_description)
+    if not calories_match:
+        return None
+    fat_match = FAT_PATTERN.search(food_description)
+    carbs_match = CARBS_PATTERN.search(food_description)
+    protein_match = PROTEIN_PATTERN.search(food_description)
+
+    serving_match = SERVING_PATTERN.match(food_description)
+    if serving_match:
+        serving = food_description[:serving_match.end()].rstrip(' -').strip()
+        serving_grams = _serving_grams(serving_match.group('amount'), serving_match.group('unit'))
+    else:
+        # Äldre loggar sparade bara "Calories: ..." och förutsatte 100 g
+        serving = 'Per 100g'
+        serving_grams = 100.0
+
+    return Nutrients(
+        serving=serving,
+        serving_grams=serving_grams,
+        calories=_number(calories_match),
+        fat=_number(fat_match),
+        carbohydrates=_number(carbs_match),
+        protein=_number(protein_match),
+    )
+
+
+class _ParsedFoodCache:
+    """Begränsad LRU med tolkade näringsvärden per FatSecret food_id."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, food_id, food_description):
+        key = (food_id, food_description)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        nutrients = parse_description(food_description)
+        with self._lock:
+            self._entries[key] = nutrients
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return nutrients
+
+
+_parsed_foods = _ParsedFoodCache()
+
+def parse_food(food_id, food_description):
+    """Som parse_description men cachat per food_id så att samma livsmedel bara tolkas en gång."""
+    if not food_id:
+        return parse_description(food_description)
+    return _parsed_foods.get_or_parse(str(food_id), food_description)
+
+def annotate_foods(foods):
+    """
+    Returnerar FatSecret-träffar med tolkade näringsvärden under 'nutrients'.
+    Originalen ändras inte eftersom de kan ligga i sökcachen.
+    """
+    if isinstance(foods, dict):
+        foods = [foods]
+    annotated = []
+    for food in foods:
+        nutrients = parse_food(food.get('food_id'), food.get('food_description'))
+        annotated.append({**food, 'nutrients': nutrients.to_dict() if nutrients else None})
+    return annotated
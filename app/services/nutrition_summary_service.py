@@ -0,0 +1,141 @@
+from app import db
+from app.database import reads
+from app.models import FoodLog, DailyNutritionSummary
+from app.services.sql_helpers import insert_for_dialect
+
+SUMMARY_COLUMNS = ('calories', 'protein', 'carbohydrates', 'fat')
+
+
+def _value(entry, column):
+    value = entry[column] if isinstance(entry, dict) else getattr(entry, column)
+    return value or 0
+
+def apply_food_logs(entries, sign=1):
+    """
+    Lägger till (sign=1) eller drar av (sign=-1) matloggar i dagssummeringen.
+    `entries` kan vara FoodLog-objekt eller dicts med samma fält, t.ex. från en
+    bulkimport. En dict kan ange `item_count` när den redan summerar flera
+    loggar. Körs i anroparens transaktion, så commit sker tillsammans med
+    loggarna.
+    """
+    totals = {}
+    for entry in entries:
+        key = (_value(entry, 'user_id'), _value(entry, 'date'), _value(entry, 'meal_type'))
+        row = totals.setdefault(key, {column: 0.0 for column in SUMMARY_COLUMNS} | {'item_count': 0})
+        for column in SUMMARY_COLUMNS:
+            row[column] += sign * _value(entry, column)
+        count = entry.get('item_count', 1) if isinstance(entry, dict) else 1
+        row['item_count'] += sign * count
+
+    if not totals:
+        return
+
+    rows = [
+        {'user_id': user_id, 'date': day, 'meal_type': meal_type, **values}
+        for (user_id, day, meal_type), values in totals.items()
+    ]
+    stmt = insert_for_dialect(DailyNutritionSummary)
+    table = DailyNutritionSummary.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'date', 'meal_type'],
+        set_={
+            column: table.c[column] + stmt.excluded[column]
+            for column in SUMMARY_COLUMNS + ('item_count',)
+        }
+    )
+    db.session.execute(stmt, rows)
+
+    if sign < 0:
+        # Ta bort måltider som inte längre har några loggar
+        db.session.execute(
+            db.delete(DailyNutritionSummary).where(
+                DailyNutritionSummary.item_count <= 0,
+                db.tuple_(
+                    DailyNutritionSummary.user_id,
+                    DailyNutritionSummary.date,
+                    DailyNutritionSummary.meal_type
+                ).in_(list(totals))
+            )
+        )
+
+def record_food_log(log):
+    apply_food_logs([log], sign=1)
+
+def remove_food_log(log):
+    apply_food_logs([log], sign=-1)
+
+def get_day_summary(user_id, day):
+    """Dagens summering per måltid samt totalt, från summeringstabellen."""
+    rows = reads.scalars(
+        db.select(DailyNutritionSummary).where(
+            DailyNutritionSummary.user_id == user_id,
+            DailyNutritionSummary.date == day
+        )
+    ).all()
+
+    meals = {}
+    total = {column: 0.0 for column in SUMMARY_COLUMNS} | {'item_count': 0}
+    for row in rows:
+        meals[row.meal_type] = {column: getattr(row, column) for column in SUMMARY_COLUMNS + ('item_count',)}
+        for column in SUMMARY_COLUMNS + ('item_count',):
+            total[column] += getattr(row, column)
+    return {'meals': meals, 'total': total}
+
+def _raw_totals_query(user_id=None):
+    query = db.select(
+        FoodLog.user_id,
+        FoodLog.date,
+        FoodLog.meal_type,
+        db.func.sum(FoodLog.calories),
+        db.func.coalesce(db.func.sum(FoodLog.protein), 0),
+        db.func.coalesce(db.func.sum(FoodLog.carbohydrates), 0),
+        db.func.coalesce(db.func.sum(FoodLog.fat), 0),
+        db.func.count(FoodLog.id)
+    ).group_by(FoodLog.user_id, FoodLog.date, FoodLog.meal_type)
+    if user_id is not None:
+        query = query.where(FoodLog.user_id == user_id)
+    return query
+
+def logged_totals(user_id, dates):
+    """
+    Loggarnas summor per måltid för de givna datumen, som dicts med
+    `item_count` för apply_food_logs. Används innan loggarna tas bort i bulk.
+    """
+    query = _raw_totals_query(user_id).where(FoodLog.date.in_(sorted(dates)))
+    columns = ('user_id', 'date', 'meal_type', *SUMMARY_COLUMNS, 'item_count')
+    return [dict(zip(columns, row)) for row in db.session.execute(query)]
+
+def rebuild(user_id=None):
+    """Bygger om summeringen från FoodLog. Returnerar antal summeringsrader."""
+    delete = db.delete(DailyNutritionSummary)
+    if user_id is not None:
+        delete = delete.where(DailyNutritionSummary.user_id == user_id)
+    db.session.execute(delete)
+
+    columns = ['user_id', 'date', 'meal_type', *SUMMARY_COLUMNS, 'item_count']
+    result = db.session.execute(
+        db.insert(DailyNutritionSummary).from_select(columns, _raw_totals_query(user_id))
+    )
+    db.session.commit()
+    return result.rowcount
+
+def verify(user_id=None, tolerance=0.01):
+    """Jämför summeringen med FoodLog. Returnerar en lista med avvikande (user_id, date, meal_type)."""
+    expected = {}
+    for user, day, meal_type, *values in db.session.execute(_raw_totals_query(user_id)):
+        expected[(user, day, meal_type)] = values
+
+    query = db.select(DailyNutritionSummary)
+    if user_id is not None:
+        query = query.where(DailyNutritionSummary.user_id == user_id)
+    actual = {
+        (row.user_id, row.date, row.meal_type): [getattr(row, c) for c in SUMMARY_COLUMNS + ('item_count',)]
+        for row in db.session.scalars(query)
+    }
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        want, have = expected.get(key), actual.get(key)
+        if want is None or have is None or any(abs(w - h) > tolerance for w, h in zip(want, have)):
+            mismatches.append(key)
+    return sorted(mismatches)
@@ -0,0 +1,77 @@
+from app import db
+from app.database import reads
+from app.models import Recipe, RecipeIngredient
+
+# Receptkolumn -> ingredienskolumn som summeras
+TOTAL_COLUMNS = {
+    'total_grams': RecipeIngredient.grams,
+    'total_calories': RecipeIngredient.calories,
+    'total_protein': RecipeIngredient.protein,
+    'total_carbohydrates': RecipeIngredient.carbohydrates,
+    'total_fat': RecipeIngredient.fat,
+}
+
+
+def totals_values():
+    """Korrelerade delfrågor som räknar fram receptets summor ur ingredienserna."""
+    def ingredient_sum(column):
+        return db.select(db.func.coalesce(db.func.sum(column), 0)).where(
+            RecipeIngredient.recipe_id == Recipe.id
+        ).scalar_subquery()
+
+    values = {name: ingredient_sum(column) for name, column in TOTAL_COLUMNS.items()}
+    values['ingredient_count'] = db.select(db.func.count(RecipeIngredient.id)).where(
+        RecipeIngredient.recipe_id == Recipe.id
+    ).scalar_subquery()
+    return values
+
+def recompute_totals(recipe_ids=None):
+    """
+    Räknar om summorna för angivna recept (eller alla) i en UPDATE. Körs i
+    anroparens transaktion efter att ingredienser lagts till eller ändrats.
+    """
+    stmt = db.update(Recipe).values(**totals_values())
+    if recipe_ids is not None:
+        stmt = stmt.where(Recipe.id.in_(list(recipe_ids)))
+    db.session.execute(stmt.execution_options(synchronize_session=False))
+
+def list_recipes(user_id, page=1, per_page=20, with_ingredients=True):
+    """
+    En sida med användarens recept, nyast först. Ingredienserna laddas med
+    selectinload i en extra fråga. Returnerar (recept, finns_fler) utan COUNT.
+    """
+    query = db.select(Recipe).where(Recipe.user_id == user_id).order_by(Recipe.id.desc())
+    if with_ingredients:
+        query = query.options(db.selectinload(Recipe.ingredients))
+    # Hämta en extra rad för att veta om det finns en nästa sida
+    recipes = reads.scalars(query.limit(per_page + 1).offset((page - 1) * per_page)).all()
+    return recipes[:per_page], len(recipes) > per_page
+
+def recipe_to_dict(recipe, with_ingredients=True):
+    result = {
+        'id': recipe.id,
+        'name': recipe.name,
+        'ingredient_count': recipe.ingredient_count,
+        'totals': {
+            'grams': recipe.total_grams,
+            'calories': recipe.total_calories,
+            'protein': recipe.total_protein,
+            'carbohydrates': recipe.total_carbohydrates,
+            'fat': recipe.total_fat,
+        },
+        'per_100g': recipe.per_100g(),
+    }
+    if with_ingredients:
+        result['ingredients'] = [
+            {
+                'id': ing.id,
+                'food_name': ing.food_name,
+                'grams': ing.grams,
+                'calories': ing.calories,
+                'protein': ing.protein,
+                'carbohydrates': ing.carbohydrates,
+                'fat': ing.fat,
+            }
+            for ing in recipe.ingredients
+        ]
+    return result
@@ -0,0 +1,20 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+
+def insert_for_dialect(model):
+    """Returnerar en INSERT för aktuell databas som stöder ON CONFLICT (SQLite och PostgreSQL)."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT stöds inte för databasen '{dialect}'.")
+
+def upsert(model, index_elements, update_columns):
+    """INSERT ... ON CONFLICT (index_elements) DO UPDATE SET kolumn = excluded.kolumn."""
+    stmt = insert_for_dialect(model)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: getattr(stmt.excluded, column) for column in update_columns}
+    )
@@ -1,60 +1,157 @@
 from datetime import date, timedelta
+from flask import current_app
 from app import db
-from app.models import User, WeightLog, FoodLog
+from app.database import reads
+from app.models import User, WeightLog, DailyNutritionSummary
+from app.services.training_service import daily_burn
+from app.services import downsampling
 
-def calculate_weight_stats(user_id):
-    """Beräknar viktstatistik för en given användare."""
+DEFAULT_WINDOWS = (7, 14, 30, 90)
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
+
+def trend_step(trend_weight, weight, gap_days, alpha):
+    """Ett steg i den utjämnade trendvikten. Dagar utan loggning ger större steg mot nästa mätning."""
+    step_alpha = 1 - (1 - alpha) ** max(gap_days, 1)
+    return trend_weight + step_alpha * (weight - trend_weight)
+
+def compute_weight_stats(user_id, windows=DEFAULT_WINDOWS, trend_alpha=None):
+    """
+    Beräknar all viktstatistik i en enda fråga och ett enda pass över historiken:
+    glidande medel och förändring mot föregående period för varje fönster,
+    min/max och en exponentiellt utjämnad trendvikt. Serien för grafer ingår.
+    """
+    if trend_alpha is None:
+        trend_alpha = current_app.config['WEIGHT_TREND_ALPHA']
     today = date.today()
-    
-    # Senaste 7 dagarna
-    start_of_period1 = today - timedelta(days=6)
-    logs_p1_query = db.select(WeightLog.weight).where(
-        WeightLog.user_id == user_id,
-        WeightLog.date >= start_of_period1
-    )
-    logs_p1 = db.session.scalars(logs_p1_query).all()
-    
-    avg_p1 = round(sum(logs_p1) / len(logs_p1), 1) if logs_p1 else None
-
-    # Föregående 7-dagarsperiod
-    start_of_period2 = today - timedelta(days=13)
-    end_of_period2 = today - timedelta(days=7)
-    logs_p2_query = db.select(WeightLog.weight).where(
-        WeightLog.user_id == user_id,
-        WeightLog.date >= start_of_period2,
-        WeightLog.date <= end_of_period2
-    )
-    logs_p2 = db.session.scalars(logs_p2_query).all()
+    logs_query = db.select(WeightLog.date, WeightLog.weight).where(
+        WeightLog.user_id == user_id
+    ).order_by(WeightLog.date.asc())
+    points = reads.execute(logs_query).all()
 
-    avg_p2 = round(sum(logs_p2) / len(logs_p2), 1) if logs_p2 else None
-    
-    change = None
-    if avg_p1 is not None and avg_p2 is not None:
-        change = avg_p1 - avg_p2
+    # [summa, antal, min, max] för nuvarande och föregående period per fönster
+    current = {w: [0.0, 0, None, None] for w in windows}
+    previous = {w: [0.0, 0] for w in windows}
+    trend = []
+    trend_weight = None
+    previous_date = None
+    overall_min = overall_max = None
+
+    for log_date, weight in points:
+        days_ago = (today - log_date).days
+        for w in windows:
+            if 0 <= days_ago < w:
+                bucket = current[w]
+                bucket[0] += weight
+                bucket[1] += 1
+                bucket[2] = weight if bucket[2] is None else min(bucket[2], weight)
+                bucket[3] = weight if bucket[3] is None else max(bucket[3], weight)
+            elif w <= days_ago < 2 * w:
+                previous[w][0] += weight
+                previous[w][1] += 1
+
+        overall_min = weight if overall_min is None else min(overall_min, weight)
+        overall_max = weight if overall_max is None else max(overall_max, weight)
+
+        if trend_weight is None:
+            trend_weight = weight
+        else:
+            trend_weight = trend_step(trend_weight, weight, (log_date - previous_date).days, trend_alpha)
+        trend.append(round(trend_weight, 2))
+        previous_date = log_date
 
-    return {"avg_7_days": avg_p1, "change": change}
+    window_stats = {}
+    for w in windows:
+        total, count, low, high = current[w]
+        avg_current = _average(total, count)
+        avg_previous = _average(*previous[w])
+        change = None
+        if avg_current is not None and avg_previous is not None:
+            change = round(avg_current - avg_previous, 2)
+        window_stats[w] = {
+            "avg": avg_current,
+            "previous_avg": avg_previous,
+            "change": change,
+            "min": low,
+            "max": high,
+            "count": count,
+        }
+
+    first_window = window_stats.get(7, {})
+    return {
+        "points": points,
+        "labels": [log_date.strftime('%Y-%m-%d') for log_date, _ in points],
+        "data": [weight for _, weight in points],
+        "trend": trend,
+        "latest": points[-1].weight if points else None,
+        "trend_weight": round(trend_weight, 2) if trend_weight is not None else None,
+        "min": overall_min,
+        "max": overall_max,
+        "windows": window_stats,
+        # Samma nycklar som tidigare för dashboard- och viktmallarna
+        "avg_7_days": first_window.get("avg"),
+        "change": first_window.get("change"),
+    }
+
+def calculate_weight_stats(user_id):
+    """Beräknar viktstatistik för en given användare."""
+    return compute_weight_stats(user_id)
 
 def calculate_calorie_stats(user_id):
-    """Beräknar dagens kaloriintag och mål."""
+    """Beräknar dagens kaloriintag, förbrukning från träning och mål."""
     today = date.today()
     
-    # Hämta totala kalorier för idag
-    total_calories_query = db.session.query(db.func.sum(FoodLog.calories)).filter(
-        FoodLog.user_id == user_id,
-        FoodLog.date == today
+    # Hämta totala kalorier för idag från dagssummeringen
+    total_calories_query = db.select(db.func.sum(DailyNutritionSummary.calories)).where(
+        DailyNutritionSummary.user_id == user_id,
+        DailyNutritionSummary.date == today
     )
-    total_calories = total_calories_query.scalar() or 0
+    total_calories = reads.scalar(total_calories_query) or 0
+    burned_calories = daily_burn(user_id, today, today).get(today, 0)
+    net_calories = total_calories - burned_calories
     
-    # Hämta användarens mål (hårdkodat för nu)
-    # TODO: Flytta till User-modellen
-    calorie_goal = 2200
+    # Målet räknas fram av energy_balance_service och gäller nettointag
+    user = db.session.get(User, user_id)
+    calorie_goal = user.calorie_goal if user and user.calorie_goal else current_app.config['DEFAULT_CALORIE_GOAL']
     
-    remaining_calories = calorie_goal - total_calories
-    progress_percentage = (total_calories / calorie_goal) * 100 if calorie_goal > 0 else 0
+    remaining_calories = calorie_goal - net_calories
+    progress_percentage = min(max(net_calories / calorie_goal * 100, 0), 100) if calorie_goal > 0 else 0
     
     return {
         "total_calories": total_calories,
+        "burned_calories": burned_calories,
+        "net_calories": net_calories,
         "calorie_goal": calorie_goal,
         "remaining_calories": remaining_calories,
         "progress_percentage": progress_percentage
     }
+
+def energy_balance_view(user_id):
+    """Den sparade energibalansen för dashboardens TDEE-kort."""
+    user = db.session.get(User, user_id)
+    return {
+        "maintenance_calories": user.maintenance_calories if user else None,
+        "calorie_goal": user.calorie_goal if user else None,
+        "weekly_weight_goal": user.weekly_weight_goal if user else 0,
+        "updated": user.energy_balance_date.isoformat() if user and user.energy_balance_date else None,
+    }
+
+def build_dashboard_view(user_id):
+    """
+    Vymodellen för dashboarden. Innehåller bara enkla typer så att den kan
+    cachas i både minnet och SQLite (se view_cache). Statistiken räknas på
+    hela historiken, men grafen får bara DASHBOARD_CHART_POINTS punkter.
+    """
+    weight_stats = compute_weight_stats(user_id)
+    chart = downsampling.lttb(weight_stats["points"], current_app.config['DASHBOARD_CHART_POINTS'])
+    return {
+        "weight_stats": {
+            key: weight_stats[key]
+            for key in ("avg_7_days", "change", "latest", "trend_weight", "min", "max")
+        },
+        "calorie_stats": calculate_calorie_stats(user_id),
+        "energy_balance": energy_balance_view(user_id),
+        "labels": [log_date.strftime('%Y-%m-%d') for log_date, _ in chart],
+        "data": [weight for _, weight in chart],
+    }
@@ -0,0 +1,216 @@
+import bisect
+import threading
+from flask import current_app
+from app import db
+from app.models import FoodLog, Recipe, RecipeIngredient, Food
+from app.services.catalog_service import to_search_result
+from app.services.food_cache import normalize_search_term
+
+# Högre vikt sorteras först bland förslag med samma träffkvalitet
+SOURCE_WEIGHTS = {'history': 3, 'recipe': 2, 'catalog': 1, 'fatsecret': 0}
+# Källor som bara visas för användaren som loggat namnet
+USER_SOURCES = {'history', 'recipe'}
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSuggestIndex:
+    """
+    Lokalt prefix- och trigramindex över livsmedelsnamn för typeahead. Hålls i
+    minnet per process och fylls på inkrementellt när nya namn dyker upp.
+    Katalog- och FatSecret-namn är gemensamma; loggade namn och
+    receptingredienser hör till en användare och visas bara för den.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}       # normaliserat namn -> förslag
+        self._words = []         # sorterad lista av (ord, normaliserat namn)
+        self._bulk_words = None  # ord som samlas under bygget och sorteras en gång
+        self._trigrams = {}      # trigram -> set av normaliserade namn
+        self.built = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, food_name, source, food_id=None, food_description=None, user_id=None):
+        if not food_name:
+            return
+        key = normalize_search_term(food_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'food_name': food_name,
+                    'food_id': None,
+                    'food_description': None,
+                    'source': None,      # bästa gemensamma källa
+                    'users': {},         # user_id -> bästa egna källa
+                }
+                self._index_key(key)
+
+            if source in USER_SOURCES:
+                current = entry['users'].get(user_id)
+                if current is None or SOURCE_WEIGHTS[source] > SOURCE_WEIGHTS[current]:
+                    entry['users'][user_id] = source
+            else:
+                if entry['source'] is None:
+                    # Visa det gemensamma namnet, inte en annan användares stavning
+                    entry['food_name'] = food_name
+                    entry['source'] = source
+                elif SOURCE_WEIGHTS[source] > SOURCE_WEIGHTS[entry['source']]:
+                    entry['source'] = source
+                # Komplettera med FatSecret-data
+                if food_id and not entry['food_id']:
+                    entry['food_id'] = food_id
+                    entry['food_description'] = food_description
+
+    def _index_key(self, key):
+        if self._bulk_words is not None:
+            self._bulk_words.update((word, key) for word in key.split())
+        else:
+            for word in set(key.split()):
+                bisect.insort(self._words, (word, key))
+        for gram in _trigrams(key):
+            self._trigrams.setdefault(gram, set()).add(key)
+
+    def begin_bulk(self):
+        """Samlar ord i en mängd i stället för att sortera in dem ett i taget."""
+        with self._lock:
+            self._bulk_words = set(self._words)
+
+    def end_bulk(self):
+        with self._lock:
+            self._words = sorted(self._bulk_words)
+            self._bulk_words = None
+
+    def add_fatsecret_foods(self, foods):
+        if isinstance(foods, dict):
+            # FatSecret returnerar ett objekt i stället för en lista när det bara finns en träff
+            foods = [foods]
+        for food in foods:
+            self.add(food.get('food_name'), 'fatsecret', food.get('food_id'), food.get('food_description'))
+
+    @staticmethod
+    def _source_for(entry, user_id):
+        """Källan som användaren ser, None om namnet bara finns i andras historik."""
+        own = entry['users'].get(user_id) if user_id is not None else None
+        if own is None:
+            return entry['source']
+        if entry['source'] is None or SOURCE_WEIGHTS[own] > SOURCE_WEIGHTS[entry['source']]:
+            return own
+        return entry['source']
+
+    def _prefix_matches(self, query):
+        """Namn där något ord börjar med första ordet i frågan och hela frågan finns med."""
+        first_word = query.split()[0]
+        start = bisect.bisect_left(self._words, (first_word,))
+        matches = {}
+        for i in range(start, len(self._words)):
+            word, key = self._words[i]
+            if not word.startswith(first_word):
+                break
+            if query in key:
+                # Rangordna träffar i början av namnet före träffar i senare ord
+                matches[key] = 0 if key.startswith(query) else 1
+        return matches
+
+    def _trigram_matches(self, query, exclude, min_coverage=0.5):
+        grams = _trigrams(query)
+        counts = {}
+        for gram in grams:
+            for key in self._trigrams.get(gram, ()):
+                if key not in exclude:
+                    counts[key] = counts.get(key, 0) + 1
+        # Andel av frågans trigram som finns i namnet, så att 'filé' hittar 'kycklingfilé'
+        return [
+            (key, shared / len(grams))
+            for key, shared in counts.items()
+            if shared / len(grams) >= min_coverage
+        ]
+
+    def suggest(self, query, limit=8, user_id=None):
+        query = normalize_search_term(query)
+        if not query:
+            return []
+
+        with self._lock:
+            sources = {}
+
+            def visible(key):
+                source = self._source_for(self._entries[key], user_id)
+                if source is not None:
+                    sources[key] = source
+                return source is not None
+
+            prefix = {key: rank for key, rank in self._prefix_matches(query).items() if visible(key)}
+            ranked = sorted(prefix, key=lambda k: (prefix[k], -SOURCE_WEIGHTS[sources[k]], len(k)))
+            if len(ranked) < limit:
+                fuzzy = [item for item in self._trigram_matches(query, exclude=prefix) if visible(item[0])]
+                fuzzy.sort(key=lambda item: (-item[1], -SOURCE_WEIGHTS[sources[item[0]]], len(item[0])))
+                ranked.extend(key for key, _ in fuzzy)
+            return [
+                {
+                    'food_name': self._entries[key]['food_name'],
+                    'food_id': self._entries[key]['food_id'],
+                    'food_description': self._entries[key]['food_description'],
+                    'source': sources[key],
+                }
+                for key in ranked[:limit]
+            ]
+
+
+def _build(index):
+    """Fyller indexet med loggade namn, receptingredienser, den lokala katalogen och cachade FatSecret-svar."""
+    index.begin_bulk()
+    try:
+        _add_all(index)
+    finally:
+        index.end_bulk()
+    index.built = True
+
+def _add_all(index):
+    for user_id, name in db.session.execute(db.select(FoodLog.user_id, FoodLog.food_name).distinct()):
+        index.add(name, 'history', user_id=user_id)
+    ingredients = (
+        db.select(Recipe.user_id, RecipeIngredient.food_name)
+        .join(Recipe, RecipeIngredient.recipe_id == Recipe.id)
+        .distinct()
+    )
+    for user_id, name in db.session.execute(ingredients):
+        index.add(name, 'recipe', user_id=user_id)
+    for food in db.session.scalars(db.select(Food).execution_options(yield_per=1000)):
+        result = to_search_result(food)
+        index.add(result['food_name'], 'catalog', result['food_id'], result['food_description'])
+
+    cache = current_app.extensions['food_search_cache']
+    for search_data in cache.iter_values():
+        if search_data and 'foods' in search_data and 'food' in search_data['foods']:
+            index.add_fatsecret_foods(search_data['foods']['food'])
+
+
+def init_app(app):
+    app.extensions['food_suggest_index'] = FoodSuggestIndex()
+
+def get_index():
+    """Returnerar processens index och bygger det vid första användningen."""
+    index = current_app.extensions['food_suggest_index']
+    if not index.built:
+        with index._lock:
+            if not index.built:
+                _build(index)
+    return index
+
+def remember_food_name(user_id, food_name, source='history'):
+    """Lägger till ett nyloggat namn om indexet redan är byggt (annars kommer det med vid bygget)."""
+    index = current_app.extensions['food_suggest_index']
+    if index.built:
+        index.add(food_name, source, user_id=user_id)
+
+def remember_fatsecret_foods(foods):
+    index = current_app.extensions['food_suggest_index']
+    if index.built:
+        index.add_fatsecret_foods(foods)
@@ -0,0 +1,119 @@
+from datetime import date, timedelta
+from app import db
+from app.database import reads
+from app.models import StepLog, CardioLog, FightRondLog
+
+ACTIVITY_TYPES = ('steps', 'cardio', 'fight_rond')
+
+
+def _activity_rows_query(user_id, start, end):
+    """
+    Alla träningsloggar i perioden som en UNION ALL med gemensamma kolumner,
+    så att sidan klarar sig med en enda fråga mot databasen.
+    """
+    null_int = db.null().cast(db.Integer)
+    null_float = db.null().cast(db.Float)
+    steps = db.select(
+        db.literal('steps').label('kind'), StepLog.id, StepLog.date,
+        StepLog.steps.label('steps'), null_int.label('duration_seconds'),
+        null_float.label('distance_km'), db.literal(0).label('calories_burned'),
+        null_int.label('bpm'),
+    ).where(StepLog.user_id == user_id, StepLog.date.between(start, end))
+    cardio = db.select(
+        db.literal('cardio'), CardioLog.id, CardioLog.date,
+        null_int, CardioLog.duration_seconds,
+        CardioLog.distance_km, CardioLog.calories_burned,
+        CardioLog.avg_bpm,
+    ).where(CardioLog.user_id == user_id, CardioLog.date.between(start, end))
+    fight_rond = db.select(
+        db.literal('fight_rond'), FightRondLog.id, FightRondLog.date,
+        null_int, db.literal(180),  # en rond är alltid tre minuter
+        null_float, FightRondLog.calories_burned,
+        FightRondLog.bpm,
+    ).where(FightRondLog.user_id == user_id, FightRondLog.date.between(start, end))
+    union = db.union_all(steps, cardio, fight_rond).subquery()
+    return db.select(union).order_by(union.c.date, union.c.kind, union.c.id)
+
+def _empty_totals():
+    return {
+        'steps': 0,
+        'step_days': 0,
+        'calories_burned': 0,
+        'activities': {
+            kind: {'sessions': 0, 'duration_seconds': 0, 'distance_km': 0.0, 'calories_burned': 0}
+            for kind in ACTIVITY_TYPES if kind != 'steps'
+        },
+    }
+
+def _add(totals, row):
+    if row.kind == 'steps':
+        totals['steps'] += row.steps
+        totals['step_days'] += 1
+        return
+    activity = totals['activities'][row.kind]
+    activity['sessions'] += 1
+    activity['duration_seconds'] += row.duration_seconds or 0
+    activity['distance_km'] += row.distance_km or 0.0
+    activity['calories_burned'] += row.calories_burned or 0
+    totals['calories_burned'] += row.calories_burned or 0
+
+def get_training_summary(user_id, days=7, today=None):
+    """
+    Dagens och de senaste `days` dagarnas träning: steg, antal pass, tid,
+    distans och förbrukade kalorier per aktivitet, en serie per dag för grafer
+    samt dagens enskilda pass. Allt från en fråga.
+    """
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    rows = reads.execute(_activity_rows_query(user_id, start, today)).all()
+
+    today_totals = _empty_totals()
+    period_totals = _empty_totals()
+    daily = {start + timedelta(days=i): {'steps': 0, 'calories_burned': 0} for i in range(days)}
+    today_logs = {'cardio': [], 'fight_rond': []}
+
+    for row in rows:
+        _add(period_totals, row)
+        daily[row.date]['steps'] += row.steps or 0
+        daily[row.date]['calories_burned'] += row.calories_burned or 0
+        if row.date == today:
+            _add(today_totals, row)
+            if row.kind == 'cardio':
+                today_logs['cardio'].append({
+                    'id': row.id,
+                    'duration_seconds': row.duration_seconds,
+                    'distance_km': row.distance_km,
+                    'avg_bpm': row.bpm,
+                    'calories_burned': row.calories_burned,
+                })
+            elif row.kind == 'fight_rond':
+                today_logs['fight_rond'].append({
+                    'id': row.id,
+                    'bpm': row.bpm,
+                    'calories_burned': row.calories_burned,
+                })
+
+    return {
+        'date': today.isoformat(),
+        'today': today_totals,
+        'period': {'start': start.isoformat(), 'end': today.isoformat(), 'days': days, **period_totals},
+        'daily': [
+            {'date': day.isoformat(), **values} for day, values in daily.items()
+        ],
+        'today_logs': today_logs,
+    }
+
+def daily_burn(user_id, start, end):
+    """Förbrukade kalorier per dag från konditionspass och ronder, i en grupperad fråga."""
+    burn = db.union_all(
+        db.select(CardioLog.date, CardioLog.calories_burned).where(
+            CardioLog.user_id == user_id, CardioLog.date.between(start, end)
+        ),
+        db.select(FightRondLog.date, FightRondLog.calories_burned).where(
+            FightRondLog.user_id == user_id, FightRondLog.date.between(start, end)
+        ),
+    ).subquery()
+    rows = reads.execute(
+        db.select(burn.c.date, db.func.sum(burn.c.calories_burned)).group_by(burn.c.date)
+    ).all()
+    return {day: total or 0 for day, total in rows}
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from flask import current_app
+from app.services import data_version
+
+
+class MemoryBackend:
+    """Cache i minnet. Varje worker har sin egen, så invalideringar syns bara i den egna processen."""
+    shared = False
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class SQLiteBackend:
+    """Cache i en lokal SQLite-fil som alla gunicorn-workers delar, så invalideringar syns överallt."""
+    shared = True
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS view_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM view_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO view_cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+        )
+
+    def delete_prefix(self, prefix):
+        # Nycklar innehåller inga LIKE-jokertecken utöver de vi själva lägger till
+        self._connect().execute('DELETE FROM view_cache WHERE key LIKE ?', (prefix + '%',))
+
+
+class NullBackend:
+    shared = True
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+
+def init_app(app):
+    backend = app.config['VIEW_CACHE_BACKEND']
+    if backend == 'sqlite':
+        app.extensions['view_cache'] = SQLiteBackend(app.config['VIEW_CACHE_SQLITE_PATH'])
+    elif backend == 'memory':
+        app.extensions['view_cache'] = MemoryBackend()
+    elif backend == 'none':
+        app.extensions['view_cache'] = NullBackend()
+    else:
+        raise ValueError(f"Okänd VIEW_CACHE_BACKEND: {backend}")
+
+def _backend():
+    return current_app.extensions['view_cache']
+
+def _dashboard_key(user_id):
+    # Dagens datum ingår eftersom kaloristatistiken gäller "idag"
+    return f"dashboard:{user_id}:{date.today().isoformat()}"
+
+def get_dashboard(user_id):
+    """
+    Returnerar cachad dashboard-vymodell eller None. Dataversionen jämförs alltid:
+    en minnesbackend nås inte av skrivningar i andra workers, och även en delad
+    backend kan ha fått en vy som byggdes medan en skrivning invaliderade.
+    """
+    backend = _backend()
+    try:
+        entry = backend.get(_dashboard_key(user_id))
+    except sqlite3.Error as e:
+        current_app.logger.warning(f"Kunde inte läsa vy-cachen: {e}")
+        return None
+    if entry is None:
+        return None
+    if entry['data_version'] != data_version.get(user_id):
+        return None
+    return entry['view']
+
+def set_dashboard(user_id, view, version=None):
+    if version is None:
+        version = data_version.get(user_id)
+    try:
+        _backend().set(
+            _dashboard_key(user_id),
+            {'data_version': version, 'view': view},
+            current_app.config['VIEW_CACHE_TTL']
+        )
+    except sqlite3.Error as e:
+        current_app.logger.warning(f"Kunde inte skriva till vy-cachen: {e}")
+
+def invalidate_user(user_id):
+    """Glömmer alla cachade vyer för användaren. Anropas efter varje loggning."""
+    try:
+        _backend().delete_prefix(f"dashboard:{user_id}:")
+    except sqlite3.Error as e:
+        current_app.logger.warning(f"Kunde inte invalidera vy-cachen: {e}")
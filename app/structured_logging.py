@@ -0,0 +1,234 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Inkommande request-id från en proxy används bara om det ser rimligt ut
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Attribut som alla LogRecord har; allt annat kommer från extra= och blir egna fält
+_STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'elapsed_ms', 'fields'}
+
+
+def _cap(value, limit):
+    """
+    Gör ett extra-fält säkert att skicka till en annan tråd och begränsar
+    storleken. Stora strukturer (t.ex. API-svar) blir en avkortad JSON-sträng.
+    """
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if isinstance(value, str):
+        text = value
+    else:
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        if len(text) <= limit:
+            # En kopia, så att anroparen kan ändra originalet medan raden väntar i kön
+            return json.loads(text)
+    if len(text) <= limit:
+        return text
+    return f'{text[:limit]}…(+{len(text) - limit} tecken)'
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Körs i requesttråden innan posten köas: sätter request-id och tid sedan
+    requestens start, och samplar bort poster under WARNING enligt
+    LOG_SAMPLE_RATE (eller extra={'sample_rate': ...}). Samplingen avgörs per
+    request så att en request loggas antingen helt eller inte alls.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        request_id = None
+        if has_request_context():
+            request_id = g.get('request_id')
+            started = g.get('request_started')
+            if started is not None:
+                record.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        record.request_id = request_id or '-'
+
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, 'sample_rate', self.sample_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        if request_id is not None:
+            return (uuid.uuid5(uuid.NAMESPACE_OID, request_id).int % 10000) < rate * 10000
+        return (uuid.uuid4().int % 10000) < rate * 10000
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Lägger posterna i en begränsad kö som en QueueListener tömmer i en egen
+    tråd. Är kön full tappas posten i stället för att requesten väntar; antalet
+    tappade poster skrivs med på nästa post som kommer fram.
+    """
+
+    def __init__(self, log_queue, listener_factory, max_field_chars):
+        super().__init__(log_queue)
+        self.listener_factory = listener_factory
+        self.max_field_chars = max_field_chars
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._pid = None
+
+    def ensure_listener(self):
+        # Efter fork (t.ex. gunicorn --preload) finns inte lyssnartråden i barnprocessen
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._listener = self.listener_factory(self.queue)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def stop(self):
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def prepare(self, record):
+        message = record.getMessage()
+        record = logging.makeLogRecord(vars(record))
+        record.msg = message
+        record.message = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.fields = {
+            key: _cap(value, self.max_field_chars)
+            for key, value in vars(record).items()
+            if key not in _STANDARD_ATTRIBUTES and key != 'sample_rate'
+        }
+        if self.dropped:
+            record.fields['dropped_before'] = self.dropped
+        return record
+
+    def enqueue(self, record):
+        self.ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        # Räknaren nollställs först när posten som bär den faktiskt har köats
+        self.dropped -= record.fields.get('dropped_before', 0)
+
+
+class JsonFormatter(logging.Formatter):
+    """En JSON-rad per post med tid, nivå, request-id och extra-fälten."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        if getattr(record, 'elapsed_ms', None) is not None:
+            entry['elapsed_ms'] = record.elapsed_ms
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('[%(asctime)s] %(levelname)s %(request_id)s in %(module)s: %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return super().format(record)
+
+
+def _output_handler(config):
+    if config['LOG_FILE']:
+        # WatchedFileHandler öppnar filen igen efter logrotate
+        handler = logging.handlers.WatchedFileHandler(config['LOG_FILE'], encoding='utf-8')
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if config['LOG_FORMAT'] == 'json' else TextFormatter())
+    return handler
+
+def _start_request():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+
+def _make_finish_request(app):
+    def finish_request(response):
+        request_id = g.get('request_id')
+        if request_id is None:
+            return response
+        response.headers[REQUEST_ID_HEADER] = request_id
+        # Med instrumenteringen påslagen loggar den redan en rad per request
+        if app.config['LOG_REQUESTS'] and 'instrumentation' not in app.extensions and request.endpoint != 'static':
+            app.logger.info(
+                f"{request.method} {request.path} {response.status_code}",
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'endpoint': request.endpoint,
+                    'status': response.status_code,
+                    'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+                },
+            )
+        return response
+
+    return finish_request
+
+
+def init_app(app):
+    """
+    Ersätter Flasks standardhandler på app.logger med en köad handler. Själva
+    skrivningen till stderr eller LOG_FILE sker i en lyssnartråd, så att
+    requesttråden aldrig väntar på terminalen eller journald.
+    """
+    config = app.config
+    if not config['STRUCTURED_LOGGING']:
+        return
+
+    # app.logger delas mellan app-instanser med samma namn; ta bort en tidigare handler
+    for handler in list(app.logger.handlers):
+        app.logger.removeHandler(handler)
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.stop()
+
+    output = _output_handler(config)
+    handler = NonBlockingQueueHandler(
+        queue.Queue(maxsize=config['LOG_QUEUE_SIZE']),
+        lambda log_queue: logging.handlers.QueueListener(log_queue, output, respect_handler_level=True),
+        config['LOG_MAX_FIELD_CHARS'],
+    )
+    handler.addFilter(RequestContextFilter(config['LOG_SAMPLE_RATE']))
+    handler.ensure_listener()
+    atexit.register(handler.stop)
+
+    app.logger.addHandler(handler)
+    app.logger.setLevel(config['LOG_LEVEL'])
+    app.logger.propagate = False
+    app.extensions['structured_logging'] = handler
+
+    app.before_request(_start_request)
+    app.after_request(_make_finish_request(app))
@@ -0,0 +1,10 @@
+"""
+Reproducerbara prestandamätningar för appen.
+
+    python -m benchmarks generate --db /tmp/bench.db --users 10 --years 3
+    python -m benchmarks run --db /tmp/bench.db --mode client --mode gunicorn
+    python -m benchmarks compare benchmarks/baselines/abc1234.json benchmarks/baselines/def5678.json
+
+Data genereras deterministiskt från ett frö, FatSecret ersätts av en lokal
+stubbe med inställbar latens och resultaten sparas som JSON per commit.
+"""
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from benchmarks import runner
+from benchmarks.bench_app import create_bench_app
+from benchmarks.fatsecret_stub import FatSecretStub
+
+
+def cmd_generate(args):
+    from app import db
+    from benchmarks import datagen
+
+    if os.path.exists(args.db):
+        if not args.force:
+            sys.exit(f'{args.db} finns redan, använd --force för att skriva över.')
+        os.remove(args.db)
+    app = create_bench_app(args.db, 'http://127.0.0.1:9')
+    with app.app_context():
+        db.create_all()
+        end = date.fromisoformat(args.end) if args.end else None
+        counts = datagen.generate(
+            users=args.users, years=args.years, seed=args.seed, end=end,
+            progress=lambda done: print(f'  användare {done}/{args.users}', file=sys.stderr),
+        )
+    for table, count in counts.items():
+        print(f'{table:16} {count:>10}')
+
+def cmd_run(args):
+    stub = FatSecretStub(latency=args.fatsecret_latency, jitter=args.fatsecret_jitter).start()
+    try:
+        app = create_bench_app(args.db, stub.url, view_cache=args.view_cache)
+        users = runner.bench_users(app, args.users)
+        scenarios = [s for s in runner.SCENARIOS if not args.scenario or s.name in args.scenario]
+        results = {}
+        for mode in args.mode:
+            print(f'{mode}:')
+            if mode == 'client':
+                results['client'] = runner.run_client(app, scenarios, users, args.requests, args.warmup)
+            elif mode == 'functions':
+                results['functions'] = runner.run_functions(app, users, args.requests, args.warmup)
+            elif mode == 'gunicorn':
+                results['gunicorn'] = runner.run_gunicorn(
+                    args.db, stub.url, scenarios, users, args.requests, args.warmup,
+                    workers=args.workers, threads=args.threads, concurrency=args.concurrency,
+                    view_cache=args.view_cache,
+                )
+        params = {key: value for key, value in vars(args).items() if key != 'func'}
+        path = runner.save_results(results, params, runner.dataset_summary(app), args.output)
+        print(f'Resultaten sparades i {path}')
+    finally:
+        stub.stop()
+
+def cmd_compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    lines, regressions = runner.compare(baseline, current, args.threshold, args.metric)
+    print(f'{"läge":10} {"scenario":30} {"före":>10} {"efter":>10}')
+    for line in lines:
+        print(line)
+    if regressions:
+        print(f'{len(regressions)} regressioner.')
+        sys.exit(1)
+
+def cmd_stub(args):
+    stub = FatSecretStub(port=args.port, latency=args.fatsecret_latency, jitter=args.fatsecret_jitter)
+    print(f'FatSecret-stubbe på {stub.url} (FATSECRET_TOKEN_URL={stub.token_url}, FATSECRET_API_URL={stub.api_url})')
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Prestandamätningar för appen.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='Skapa en mätdatabas med syntetisk data.')
+    generate.add_argument('--db', required=True, help='Sökväg till SQLite-filen som skapas.')
+    generate.add_argument('--users', type=int, default=10)
+    generate.add_argument('--years', type=float, default=2)
+    generate.add_argument('--seed', type=int, default=1)
+    generate.add_argument('--end', help='Sista dag (YYYY-MM-DD), standard idag.')
+    generate.add_argument('--force', action='store_true')
+    generate.set_defaults(func=cmd_generate)
+
+    latency = argparse.ArgumentParser(add_help=False)
+    latency.add_argument('--fatsecret-latency', type=float, default=0.05, help='Sekunder per stubbsvar.')
+    latency.add_argument('--fatsecret-jitter', type=float, default=0.0, help='Extra slumpmässig fördröjning.')
+
+    run = commands.add_parser('run', parents=[latency], help='Kör mätningarna och spara resultatet som JSON.')
+    run.add_argument('--db', required=True)
+    run.add_argument('--mode', action='append', choices=('client', 'functions', 'gunicorn'),
+                     help='Kan anges flera gånger. Standard: client och functions.')
+    run.add_argument('--scenario', action='append', choices=[s.name for s in runner.SCENARIOS])
+    run.add_argument('--users', type=int, default=10, help='Antal användare att fördela anropen på.')
+    run.add_argument('--requests', type=int, default=200, help='Anrop per scenario.')
+    run.add_argument('--warmup', type=int, default=5)
+    run.add_argument('--workers', type=int, default=2, help='gunicorn-workers.')
+    run.add_argument('--threads', type=int, default=1, help='Trådar per gunicorn-worker.')
+    run.add_argument('--concurrency', type=int, default=4, help='Samtidiga klienter mot gunicorn.')
+    run.add_argument('--view-cache', default='none', choices=('none', 'memory', 'sqlite'))
+    run.add_argument('--output', help='Resultatfil, standard benchmarks/baselines/<commit>.json.')
+    run.set_defaults(func=cmd_run)
+
+    comparison = commands.add_parser('compare', help='Jämför två resultatfiler, avslutar med 1 vid regression.')
+    comparison.add_argument('baseline')
+    comparison.add_argument('current')
+    comparison.add_argument('--threshold', type=float, default=0.2, help='Tillåten försämring som andel.')
+    comparison.add_argument('--metric', default='p95_ms', choices=('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'))
+    comparison.set_defaults(func=cmd_compare)
+
+    stub = commands.add_parser('stub', parents=[latency], help='Kör bara FatSecret-stubben.')
+    stub.add_argument('--port', type=int, default=8765)
+    stub.set_defaults(func=cmd_stub)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run' and not args.mode:
+        args.mode = ['client', 'functions']
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
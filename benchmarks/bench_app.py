@@ -0,0 +1,51 @@
+import os
+from flask import g, has_request_context
+from sqlalchemy import event
+from config import Config
+from app import create_app, db
+
+QUERY_HEADER = 'X-Bench-Queries'
+
+
+def bench_config(db_path, fatsecret_url, view_cache='none', **overrides):
+    """Konfiguration för mätningar: given databas, FatSecret-stubben och ingen CSRF."""
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(db_path),
+        'SECRET_KEY': 'bench',
+        'WTF_CSRF_ENABLED': False,
+        'FATSECRET_CLIENT_ID': 'bench',
+        'FATSECRET_CLIENT_SECRET': 'bench',
+        'FATSECRET_TOKEN_URL': fatsecret_url.rstrip('/') + '/connect/token',
+        'FATSECRET_API_URL': fatsecret_url.rstrip('/') + '/rest/server.api',
+        'FATSECRET_MAX_RETRIES': 0,
+        # Varje sökning ska nå stubben om inte cachen uttryckligen mäts
+        'FOOD_CACHE_SQLITE_PATH': None,
+        'VIEW_CACHE_BACKEND': view_cache,
+        'AUTH_DEFAULT_USER_ID': None,
+        # En loggrad per request skulle dränka mätutskrifterna
+        'LOG_LEVEL': 'WARNING',
+    }
+    settings.update(overrides)
+    return type('BenchConfig', (Config,), settings)
+
+def count_queries(app):
+    """Räknar databasfrågor per request och skickar antalet i svarshuvudet X-Bench-Queries."""
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.bench_queries = g.get('bench_queries', 0) + 1
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    @app.after_request
+    def add_query_header(response):
+        response.headers[QUERY_HEADER] = str(g.get('bench_queries', 0))
+        return response
+
+def create_bench_app(db_path, fatsecret_url, view_cache='none', **overrides):
+    app = create_app(bench_config(db_path, fatsecret_url, view_cache, **overrides))
+    count_queries(app)
+    return app
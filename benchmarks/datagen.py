@@ -0,0 +1,132 @@
+import random
+from datetime import date, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User, WeightLog, FoodLog, StepLog, CardioLog, FightRondLog, Recipe, RecipeIngredient
+from app.services import nutrition_summary_service
+from app.services import recipe_service
+
+BENCH_PASSWORD = 'bench'
+MEALS = ('Frukost', 'Lunch', 'Middag', 'Mellanmål')
+
+# (namn, kcal, protein, kolhydrater, fett) per 100 g
+FOODS = (
+    ('Havregryn', 370, 13.0, 59.0, 7.0),
+    ('Mellanmjölk', 46, 3.5, 4.8, 1.5),
+    ('Banan', 89, 1.1, 22.8, 0.3),
+    ('Kycklingfilé', 110, 23.0, 0.0, 1.5),
+    ('Ris, kokt', 130, 2.7, 28.0, 0.3),
+    ('Pasta, kokt', 158, 5.8, 31.0, 0.9),
+    ('Lax', 208, 20.0, 0.0, 13.0),
+    ('Broccoli', 34, 2.8, 7.0, 0.4),
+    ('Ägg', 143, 12.6, 0.7, 9.5),
+    ('Knäckebröd', 340, 9.0, 62.0, 2.0),
+    ('Kvarg', 62, 11.0, 4.0, 0.2),
+    ('Potatis', 77, 2.0, 17.0, 0.1),
+    ('Nötfärs', 250, 17.0, 0.0, 20.0),
+    ('Äpple', 52, 0.3, 14.0, 0.2),
+    ('Jordnötssmör', 588, 25.0, 20.0, 50.0),
+)
+
+
+def _food_row(rng, user_id, day, meal_type):
+    name, kcal, protein, carbs, fat = rng.choice(FOODS)
+    grams = rng.randrange(30, 350, 10)
+    factor = grams / 100
+    return {
+        'user_id': user_id, 'date': day, 'meal_type': meal_type, 'food_name': name, 'grams': grams,
+        'calories': kcal * factor, 'protein': protein * factor, 'carbohydrates': carbs * factor,
+        'fat': fat * factor, 'base_servings_info': 'Per 100g',
+    }
+
+def user_rows(user_index, seed, start, end):
+    """
+    Alla loggrader för en användare som {modell: [rader]}. Varje användare har
+    en egen slumpgenerator, så samma frö ger samma data oavsett antal användare.
+    """
+    user_id = user_index + 1
+    rng = random.Random(f'{seed}:{user_id}')
+    rows = {WeightLog: [], FoodLog: [], StepLog: [], CardioLog: [], FightRondLog: []}
+    weight = rng.uniform(65, 105)
+    drift = rng.uniform(-0.03, 0.02)   # kg per dag
+
+    day = start
+    while day <= end:
+        weight += drift + rng.gauss(0, 0.05)
+        if rng.random() < 0.8:
+            rows[WeightLog].append({'user_id': user_id, 'date': day, 'weight': round(weight + rng.gauss(0, 0.4), 1)})
+        for meal_type in MEALS:
+            if meal_type == 'Mellanmål' and rng.random() < 0.5:
+                continue
+            for _ in range(rng.randint(1, 3)):
+                rows[FoodLog].append(_food_row(rng, user_id, day, meal_type))
+        if rng.random() < 0.9:
+            rows[StepLog].append({'user_id': user_id, 'date': day, 'steps': rng.randint(2000, 18000)})
+        if rng.random() < 0.3:
+            avg_bpm = rng.randint(120, 170)
+            duration = rng.randint(15, 70) * 60
+            rows[CardioLog].append({
+                'user_id': user_id, 'date': day, 'duration_seconds': duration, 'avg_bpm': avg_bpm,
+                'calories_burned': int(avg_bpm * duration / 60 * 0.08),
+                'distance_km': round(duration / 360 * rng.uniform(0.8, 1.2), 2),
+            })
+        if rng.random() < 0.1:
+            for _ in range(rng.randint(3, 8)):
+                bpm = rng.randint(140, 190)
+                rows[FightRondLog].append({'user_id': user_id, 'date': day, 'bpm': bpm, 'calories_burned': int(bpm * 3 * 0.08)})
+        day += timedelta(days=1)
+    return rows
+
+def recipe_rows(user_index, seed, count=5):
+    user_id = user_index + 1
+    rng = random.Random(f'{seed}:{user_id}:recipes')
+    recipes = []
+    for number in range(count):
+        ingredients = []
+        for name, kcal, protein, carbs, fat in rng.sample(FOODS, rng.randint(3, 6)):
+            grams = rng.randrange(50, 400, 10)
+            factor = grams / 100
+            ingredients.append({
+                'food_name': name, 'grams': grams, 'calories': kcal * factor,
+                'protein': protein * factor, 'carbohydrates': carbs * factor, 'fat': fat * factor,
+            })
+        recipes.append((f'Recept {number + 1}', ingredients))
+    return recipes
+
+def generate(users=10, years=2, seed=1, end=None, batch_size=5000, progress=None):
+    """
+    Fyller databasen i aktuell app-kontext med `users` användare och `years`
+    års historik fram till `end` (standard idag). Användarna heter bench1..N
+    med lösenordet BENCH_PASSWORD. Returnerar antal rader per tabell.
+    """
+    end = end or date.today()
+    start = end - timedelta(days=round(365.25 * years) - 1)
+    # Samma hash för alla användare, annars dominerar lösenordshashningen
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    counts = {}
+
+    for user_index in range(users):
+        user = User(id=user_index + 1, username=f'bench{user_index + 1}')
+        user.password_hash = password_hash
+        db.session.add(user)
+        db.session.flush()
+
+        for model, rows in user_rows(user_index, seed, start, end).items():
+            for offset in range(0, len(rows), batch_size):
+                db.session.execute(db.insert(model), rows[offset:offset + batch_size])
+            counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+
+        for name, ingredients in recipe_rows(user_index, seed):
+            recipe = Recipe(name=name, user_id=user.id)
+            db.session.add(recipe)
+            db.session.flush()
+            db.session.execute(db.insert(RecipeIngredient), [{'recipe_id': recipe.id, **ing} for ing in ingredients])
+            counts['recipe'] = counts.get('recipe', 0) + 1
+        db.session.commit()
+        if progress is not None:
+            progress(user_index + 1)
+
+    recipe_service.recompute_totals()
+    nutrition_summary_service.rebuild()
+    db.session.commit()
+    return counts
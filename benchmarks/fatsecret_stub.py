@@ -0,0 +1,110 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TOKEN_PATH = '/connect/token'
+API_PATH = '/rest/server.api'
+
+
+def fake_foods(search_term, max_results=20):
+    """Samma sökterm ger alltid samma träffar, i FatSecrets svarsformat."""
+    rng = random.Random(hashlib.sha1(search_term.encode('utf-8')).hexdigest())
+    foods = []
+    for number in range(min(max_results, 10)):
+        fat, carbs, protein = (round(rng.uniform(0, 40), 2) for _ in range(3))
+        calories = round(fat * 9 + (carbs + protein) * 4)
+        foods.append({
+            'food_id': str(rng.randrange(10 ** 6, 10 ** 7)),
+            'food_name': f'{search_term.title()} {number + 1}',
+            'food_type': 'Generic',
+            'food_description': (
+                f'Per 100g - Calories: {calories}kcal | Fat: {fat:.2f}g | Carbs: {carbs:.2f}g | Protein: {protein:.2f}g'
+            ),
+        })
+    return {'foods': {'food': foods, 'max_results': str(max_results), 'total_results': str(len(foods))}}
+
+
+class FatSecretStub:
+    """
+    Lokal ersättning för FatSecrets token- och sök-API. Varje svar fördröjs
+    `latency` sekunder plus upp till `jitter` sekunder, för att mäta hur appen
+    beter sig när uppströms är långsamt utan att bero på nätverket.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def token_url(self):
+        return self.url + TOKEN_PATH
+
+    @property
+    def api_url(self):
+        return self.url + API_PATH
+
+    def _delay(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                stub._delay()
+                if urlparse(self.path).path != TOKEN_PATH:
+                    return self._send_json(404, {'error': 'not found'})
+                self._send_json(200, {'access_token': 'bench-token', 'token_type': 'Bearer', 'expires_in': 86400})
+
+            def do_GET(self):
+                stub._delay()
+                url = urlparse(self.path)
+                if url.path != API_PATH:
+                    return self._send_json(404, {'error': 'not found'})
+                params = parse_qs(url.query)
+                term = params.get('search_expression', [''])[0]
+                max_results = int(params.get('max_results', ['20'])[0])
+                self._send_json(200, fake_foods(term, max_results))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
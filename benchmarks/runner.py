@@ -0,0 +1,297 @@
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import requests
+from sqlalchemy import event
+from app import db
+from app.models import User
+from app.services import stats_service
+from benchmarks.bench_app import QUERY_HEADER
+from benchmarks.datagen import BENCH_PASSWORD
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'baselines')
+SEARCH_WORDS = ('kyckling', 'havregryn', 'banan', 'lax', 'kvarg', 'pasta', 'broccoli', 'ägg')
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+
+    def path_for(self, number):
+        # Unika söktermer så att varje sökning går hela vägen till FatSecret-stubben
+        word = SEARCH_WORDS[number % len(SEARCH_WORDS)]
+        return self.path.format(term=f'{word} {number}')
+
+
+SCENARIOS = (
+    Scenario('dashboard', '/dashboard'),
+    Scenario('diet', '/diet'),
+    Scenario('training', '/training'),
+    Scenario('weight_data_30d', '/api/weight-data'),
+    Scenario('weight_data_all', '/api/weight-data?period=all'),
+    Scenario('weight_data_all_lttb', '/api/weight-data?period=all&points=200'),
+    Scenario('weight_data_all_month', '/api/weight-data?period=all&resolution=month'),
+    Scenario('search_food', '/api/search-food?q={term}'),
+)
+
+# Tjänstefunktioner som mäts direkt, utan HTTP
+FUNCTIONS = {
+    'stats.compute_weight_stats': stats_service.compute_weight_stats,
+    'stats.calculate_calorie_stats': stats_service.calculate_calorie_stats,
+    'stats.build_dashboard_view': stats_service.build_dashboard_view,
+}
+
+
+def percentile(sorted_values, pct):
+    """Närmaste-rang-percentil av en sorterad lista."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies, queries, elapsed, errors=0):
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'max_ms': ms(ordered[-1]) if ordered else None,
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def bench_users(app, limit):
+    with app.app_context():
+        rows = db.session.execute(db.select(User.id, User.username).order_by(User.id).limit(limit)).all()
+    if not rows:
+        raise RuntimeError('Databasen saknar användare, kör först `python -m benchmarks generate`.')
+    return rows
+
+def dataset_summary(app):
+    with app.app_context():
+        return {
+            table.name: db.session.scalar(db.select(db.func.count()).select_from(table))
+            for table in db.metadata.sorted_tables
+        }
+
+
+# --- Flask test client ---
+
+def run_client(app, scenarios, users, requests_per_scenario, warmup=5, log=print):
+    """Kör scenarierna sekventiellt mot test-klienten, användarna turas om."""
+    clients = []
+    for user_id, _ in users:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        clients.append(client)
+
+    results = {}
+    for scenario in scenarios:
+        for number in range(warmup):
+            clients[number % len(clients)].get(scenario.path_for(number))
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for number in range(requests_per_scenario):
+            client = clients[number % len(clients)]
+            t0 = time.perf_counter()
+            response = client.get(scenario.path_for(warmup + number))
+            latencies.append(time.perf_counter() - t0)
+            queries.append(int(response.headers.get(QUERY_HEADER, 0)))
+            errors += response.status_code >= 400
+        results[scenario.name] = summarize(latencies, queries, time.perf_counter() - started, errors)
+        log(_format_line(scenario.name, results[scenario.name]))
+    return results
+
+def run_functions(app, users, calls, warmup=3, log=print):
+    """Mäter stats_service-funktionerna direkt i en app-kontext."""
+    results = {}
+    with app.app_context():
+        engines = list(db.engines.values())
+        counter = [0]
+
+        def before_cursor_execute(*args):
+            counter[0] += 1
+
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            for name, function in FUNCTIONS.items():
+                for number in range(warmup):
+                    function(users[number % len(users)][0])
+                latencies, queries = [], []
+                started = time.perf_counter()
+                for number in range(calls):
+                    counter[0] = 0
+                    t0 = time.perf_counter()
+                    function(users[number % len(users)][0])
+                    latencies.append(time.perf_counter() - t0)
+                    queries.append(counter[0])
+                    db.session.remove()
+                results[name] = summarize(latencies, queries, time.perf_counter() - started)
+                log(_format_line(name, results[name]))
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return results
+
+
+# --- gunicorn över loopback ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn avslutades med kod {process.returncode}')
+        try:
+            requests.get(url, timeout=5)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn startade inte i tid')
+
+def _login(base_url, username):
+    session = requests.Session()
+    response = session.post(
+        base_url + '/login', data={'username': username, 'password': BENCH_PASSWORD}, allow_redirects=False
+    )
+    if response.status_code != 302:
+        raise RuntimeError(f'Inloggningen som {username} misslyckades ({response.status_code})')
+    return session
+
+def run_gunicorn(db_path, fatsecret_url, scenarios, users, requests_per_scenario, warmup=5,
+                 workers=2, threads=1, concurrency=4, view_cache='none', log=print):
+    """
+    Startar gunicorn mot mätdatabasen och kör varje scenario med `concurrency`
+    samtidiga klienter, var och en inloggad som en av användarna.
+    """
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, BENCH_DB=os.path.abspath(db_path), BENCH_FATSECRET_URL=fatsecret_url,
+               BENCH_VIEW_CACHE=view_cache)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'benchmarks.wsgi:app'],
+        cwd=REPO_ROOT, env=env,
+    )
+    try:
+        _wait_until_ready(base_url + '/login', process)
+        sessions = [_login(base_url, users[number % len(users)][1]) for number in range(concurrency)]
+
+        def worker(index, scenario, count, offset):
+            session = sessions[index]
+            samples = []
+            for number in range(count):
+                t0 = time.perf_counter()
+                response = session.get(base_url + scenario.path_for(offset + number * concurrency + index))
+                samples.append((time.perf_counter() - t0, int(response.headers.get(QUERY_HEADER, 0)),
+                                response.status_code >= 400))
+            return samples
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for scenario in scenarios:
+                list(pool.map(lambda index: worker(index, scenario, warmup, 0), range(concurrency)))
+                per_worker = max(1, requests_per_scenario // concurrency)
+                started = time.perf_counter()
+                batches = pool.map(
+                    lambda index: worker(index, scenario, per_worker, warmup * concurrency), range(concurrency)
+                )
+                samples = [sample for batch in batches for sample in batch]
+                elapsed = time.perf_counter() - started
+                results[scenario.name] = summarize(
+                    [s[0] for s in samples], [s[1] for s in samples], elapsed, sum(s[2] for s in samples)
+                )
+                log(_format_line(scenario.name, results[scenario.name]))
+        return results
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- Baslinjer ---
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(results, params, dataset, path=None):
+    commit = git_commit()
+    if path is None:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{commit or "unknown"}.json')
+    document = {
+        'meta': {
+            'commit': commit,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': params,
+            'dataset': dataset,
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+def compare(baseline, current, threshold=0.2, metric='p95_ms'):
+    """
+    Jämför två resultatfiler. En regression är när `metric` ökat mer än
+    `threshold` (andel) eller när antalet frågor per request ökat.
+    Returnerar (rader att skriva ut, regressioner).
+    """
+    lines, regressions = [], []
+    for mode, scenarios in current['results'].items():
+        for name, stats in scenarios.items():
+            before = baseline['results'].get(mode, {}).get(name)
+            if before is None or before.get(metric) is None or stats.get(metric) is None:
+                lines.append(f'{mode:10} {name:30} {"ny":>10} {stats.get(metric)!s:>10}')
+                continue
+            ratio = stats[metric] / before[metric] if before[metric] else float('inf')
+            queries_before, queries_now = before.get('queries_mean'), stats.get('queries_mean')
+            flags = []
+            if ratio > 1 + threshold:
+                flags.append(f'{metric} +{(ratio - 1) * 100:.0f}%')
+            if queries_before is not None and queries_now is not None and queries_now > queries_before:
+                flags.append(f'frågor {queries_before} -> {queries_now}')
+            lines.append(
+                f'{mode:10} {name:30} {before[metric]:>10.2f} {stats[metric]:>10.2f} {ratio:>6.2f}x  {", ".join(flags)}'
+            )
+            if flags:
+                regressions.append((mode, name, flags))
+    return lines, regressions
+
+def _format_line(name, stats):
+    return (
+        f'  {name:30} p50 {stats["p50_ms"]:8.2f} ms  p95 {stats["p95_ms"]:8.2f} ms  '
+        f'p99 {stats["p99_ms"]:8.2f} ms  {stats["queries_mean"]:6.1f} frågor  '
+        f'{stats["throughput_rps"]:8.1f} req/s' + (f'  {stats["errors"]} fel' if stats['errors'] else '')
+    )
@@ -0,0 +1,9 @@
+"""Ingång för gunicorn i mätningarna. Inställningarna kommer från miljön som runner sätter."""
+import os
+from benchmarks.bench_app import create_bench_app
+
+app = create_bench_app(
+    os.environ['BENCH_DB'],
+    os.environ['BENCH_FATSECRET_URL'],
+    view_cache=os.environ.get('BENCH_VIEW_CACHE', 'none'),
+)
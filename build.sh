@@ -5,6 +5,11 @@ set -o errexit
 pip install -r requirements.txt
 
 flask db upgrade
+# Med inloggning (AUTH_REQUIRED=1) behöver standardanvändaren ett lösenord, som läses från SEED_USER_PASSWORD
+if [ "${AUTH_REQUIRED:-0}" = "1" ] && [ -z "${SEED_USER_PASSWORD:-}" ]; then
+  echo "AUTH_REQUIRED=1: sätt SEED_USER_PASSWORD (används om standardanvändaren saknar lösenord)." >&2
+fi
+flask user seed
 
 npm install
-npm run build 
\ No newline at end of file
+npm run build
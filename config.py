@@ -4,12 +4,108 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+# Bara för enanvändarinstallationer utan inloggning; create_app vägrar starta med den när inloggning krävs
+DEFAULT_SECRET_KEY = 'du-kommer-aldrig-gissa'
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'du-kommer-aldrig-gissa'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # FatSecret API Keys
     FATSECRET_CLIENT_ID = os.environ.get('FATSECRET_CLIENT_ID')
-    FATSECRET_CLIENT_SECRET = os.environ.get('FATSECRET_CLIENT_SECRET') 
\ No newline at end of file
+    FATSECRET_CLIENT_SECRET = os.environ.get('FATSECRET_CLIENT_SECRET')
+    # Kan pekas om till en lokal stubbe, t.ex. i benchmarks
+    FATSECRET_TOKEN_URL = os.environ.get('FATSECRET_TOKEN_URL', 'https://oauth.fatsecret.com/connect/token')
+    FATSECRET_API_URL = os.environ.get('FATSECRET_API_URL', 'https://platform.fatsecret.com/rest/server.api')
+    # Antal sekunder innan utgång som en cachad token förnyas
+    FATSECRET_TOKEN_REFRESH_MARGIN = int(os.environ.get('FATSECRET_TOKEN_REFRESH_MARGIN', 300))
+
+    # HTTP-pool för FatSecret (en per worker-process)
+    FATSECRET_POOL_CONNECTIONS = int(os.environ.get('FATSECRET_POOL_CONNECTIONS', 4))
+    FATSECRET_POOL_MAXSIZE = int(os.environ.get('FATSECRET_POOL_MAXSIZE', 16))
+    FATSECRET_MAX_RETRIES = int(os.environ.get('FATSECRET_MAX_RETRIES', 3))
+    FATSECRET_RETRY_BACKOFF = float(os.environ.get('FATSECRET_RETRY_BACKOFF', 0.5))
+    FATSECRET_CONNECT_TIMEOUT = float(os.environ.get('FATSECRET_CONNECT_TIMEOUT', 3.05))
+    FATSECRET_READ_TIMEOUT = float(os.environ.get('FATSECRET_READ_TIMEOUT', 10))
+
+    # Cache för FatSecret-sökningar. Sätt FOOD_CACHE_SQLITE_PATH för en delad, persistent nivå.
+    FOOD_CACHE_MAX_ENTRIES = int(os.environ.get('FOOD_CACHE_MAX_ENTRIES', 2048))
+    FOOD_CACHE_TTL = int(os.environ.get('FOOD_CACHE_TTL', 7 * 24 * 3600))
+    FOOD_CACHE_EMPTY_TTL = int(os.environ.get('FOOD_CACHE_EMPTY_TTL', 3600))
+    FOOD_CACHE_SQLITE_PATH = os.environ.get('FOOD_CACHE_SQLITE_PATH')
+    # Lås mellan workers för samtidiga identiska sökningar (kräver SQLite-nivån)
+    FOOD_SEARCH_LOCK_LEASE = float(os.environ.get('FOOD_SEARCH_LOCK_LEASE', 15))
+    FOOD_SEARCH_LOCK_WAIT = float(os.environ.get('FOOD_SEARCH_LOCK_WAIT', 10))
+
+    # Antal träffar i den lokala katalogen som räcker för att inte fråga FatSecret
+    FOOD_CATALOG_MIN_RESULTS = int(os.environ.get('FOOD_CATALOG_MIN_RESULTS', 3))
+
+    # Utjämningsfaktor för trendvikten (exponentiellt glidande medel per dag)
+    WEIGHT_TREND_ALPHA = float(os.environ.get('WEIGHT_TREND_ALPHA', 0.1))
+
+    # Hur länge webbläsaren får återanvända ett sökresultat (sekunder)
+    FOOD_SEARCH_MAX_AGE = int(os.environ.get('FOOD_SEARCH_MAX_AGE', 3600))
+
+    # Cache för dashboardens vymodell: 'memory' (per worker), 'sqlite' (delad mellan workers) eller 'none'
+    VIEW_CACHE_BACKEND = os.environ.get('VIEW_CACHE_BACKEND', 'memory')
+    VIEW_CACHE_SQLITE_PATH = os.environ.get('VIEW_CACHE_SQLITE_PATH') or os.path.join(basedir, 'view_cache.db')
+    VIEW_CACHE_TTL = int(os.environ.get('VIEW_CACHE_TTL', 3600))
+    # Viktgrafen på dashboarden glesas ut till högst så många punkter (LTTB)
+    DASHBOARD_CHART_POINTS = int(os.environ.get('DASHBOARD_CHART_POINTS', 200))
+
+    # Energibalans: uppskattning av underhållskalorier ur intag, träning och trendvikt
+    ENERGY_BALANCE_WEEKS = int(os.environ.get('ENERGY_BALANCE_WEEKS', 4))
+    ENERGY_BALANCE_MIN_DAYS = int(os.environ.get('ENERGY_BALANCE_MIN_DAYS', 10))
+    KCAL_PER_KG = float(os.environ.get('KCAL_PER_KG', 7700))
+    # Används tills det finns en uppskattning för användaren
+    DEFAULT_CALORIE_GOAL = float(os.environ.get('DEFAULT_CALORIE_GOAL', 2200))
+
+    # SQLite i produktion: WAL och pragman sätts på varje anslutning (se app/database.py)
+    SQLITE_PRODUCTION_PROFILE = os.environ.get('SQLITE_PRODUCTION_PROFILE', '1') == '1'
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))     # millisekunder
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -20000))      # negativt = KiB
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+    SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW', 10))
+    # Pool för PostgreSQL
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+    # Läsreplik för tunga läsfrågor: 'ro' öppnar SQLite-filen skrivskyddat, annars en URL
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    # Så länge läser användaren från primären efter en egen skrivning
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+    # Import av loggar (`flask import` och /api/import): rader per transaktion
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+    # Export (`flask export` och /api/export): rader som hämtas från databasen åt gången
+    EXPORT_YIELD_PER = int(os.environ.get('EXPORT_YIELD_PER', 1000))
+
+    # Loggning: JSON-rader via en kö som skrivs i en egen tråd (se app/structured_logging.py)
+    STRUCTURED_LOGGING = os.environ.get('STRUCTURED_LOGGING', '1') == '1'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')            # 'json' eller 'text'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE')                        # standard stderr
+    LOG_REQUESTS = os.environ.get('LOG_REQUESTS', '1') == '1'    # en rad per request
+    # Andel av requesterna vars poster under WARNING skrivs
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+    # Andel av sökningarna där hela FatSecret-svaret loggas (på DEBUG)
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+    LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', 2000))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Instrumentering per request: Server-Timing, loggrader och /metrics (Prometheus)
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+    # Frågor som tar minst så här lång tid loggas med parametrar, 0 stänger av
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    # /metrics finns bara när den här är satt och kräver "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Inloggning slås på med AUTH_REQUIRED=1 (skapa användare med `flask user create`).
+    # Annars är det en enanvändarinstallation där alla requests körs som AUTH_DEFAULT_USER_ID.
+    AUTH_REQUIRED = os.environ.get('AUTH_REQUIRED', '0') == '1'
+    AUTH_DEFAULT_USER_ID = None if AUTH_REQUIRED else int(os.environ.get('AUTH_DEFAULT_USER_ID') or 1)
@@ -0,0 +1,26 @@
+import pytest
+from config import Config
+from app import create_app, db
+
+
+@pytest.fixture
+def app(tmp_path):
+    settings = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'SECRET_KEY': 'test',
+        'WTF_CSRF_ENABLED': False,
+        'FOOD_CACHE_SQLITE_PATH': None,
+        'VIEW_CACHE_BACKEND': 'none',
+        'AUTH_DEFAULT_USER_ID': 1,
+        'LOG_LEVEL': 'WARNING',
+    }
+    app = create_app(type('TestConfig', (Config,), settings))
+    with app.app_context():
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
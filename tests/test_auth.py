@@ -0,0 +1,59 @@
+import pytest
+from config import Config
+from app import create_app, db
+from app.models import FoodLog, User
+
+
+@pytest.fixture
+def login_app(tmp_path):
+    settings = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'SECRET_KEY': 'test',
+        'FOOD_CACHE_SQLITE_PATH': None,
+        'VIEW_CACHE_BACKEND': 'none',
+        'AUTH_DEFAULT_USER_ID': None,
+        'LOG_LEVEL': 'WARNING',
+    }
+    app = create_app(type('LoginConfig', (Config,), settings))
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='anna'))
+        db.session.commit()
+    return app
+
+FOOD = {
+    'food_name': 'Kyckling', 'food_id': '1', 'meal_type': 'Lunch', 'grams': '100',
+    'food_description': "Per 100g - Calories: 165kcal | Fat: 3.57g | Carbs: 0.00g | Protein: 31.02g",
+}
+
+
+def test_post_without_csrf_token_is_rejected(login_app):
+    client = login_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    response = client.post('/diet/add', data=FOOD)
+    assert response.status_code == 400
+    with login_app.app_context():
+        assert db.session.scalar(db.select(db.func.count(FoodLog.id))) == 0
+
+def test_post_with_csrf_token_from_page_is_accepted(login_app):
+    client = login_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    page = client.get('/diet').get_data(as_text=True)
+    token = page.split('name="csrf-token" content="')[1].split('"')[0]
+    response = client.post('/diet/add', data={**FOOD, 'csrf_token': token})
+    assert response.status_code == 302
+    with login_app.app_context():
+        assert db.session.scalar(db.select(db.func.count(FoodLog.id))) == 1
+
+def test_session_for_deleted_user_is_cleared(login_app):
+    client = login_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 99
+    response = client.get('/diet')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+    with client.session_transaction() as session:
+        assert 'user_id' not in session
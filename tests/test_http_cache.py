@@ -0,0 +1,43 @@
+from sqlalchemy import event
+from app import db
+from app.models import User, WeightLog
+from datetime import date
+
+
+def _statements(app, client, url, **kwargs):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_weight_data_304_skips_the_weight_query(app, client):
+    with app.app_context():
+        db.session.add(User(id=1, username='default'))
+        db.session.flush()
+        db.session.add(WeightLog(user_id=1, date=date.today(), weight=80.0))
+        db.session.commit()
+
+    first = client.get('/api/weight-data?period=30&points=50')
+    assert first.status_code == 200
+    etag = first.headers['ETag'].strip('"')
+
+    response, statements = _statements(
+        app, client, '/api/weight-data?period=30&points=50', headers={'If-None-Match': f'"{etag}"'}
+    )
+    assert response.status_code == 304
+    assert not any('weight_log' in statement for statement in statements)
+
+def test_weight_data_etag_changes_with_arguments(app, client):
+    first = client.get('/api/weight-data?period=30')
+    other = client.get('/api/weight-data?period=90')
+    assert first.headers['ETag'] != other.headers['ETag']
@@ -0,0 +1,35 @@
+import io
+from datetime import date
+from app import db
+from app.models import User, WeightLog, StepLog
+from app.services import log_import_service
+
+
+def _seed(app):
+    with app.app_context():
+        db.session.add(User(id=1, username='default'))
+        db.session.flush()
+        db.session.add(WeightLog(user_id=1, date=date(2024, 5, 1), weight=80.5))
+        db.session.add(StepLog(user_id=1, date=date(2024, 5, 1), steps=9000))
+        db.session.commit()
+
+
+def test_csv_export_requires_a_single_table(app, client):
+    _seed(app)
+    assert client.get('/api/export?format=csv').status_code == 400
+    assert client.get('/api/export?format=csv&tables=weight,steps').status_code == 400
+
+def test_csv_export_of_one_table_can_be_imported_again(app, client):
+    _seed(app)
+    response = client.get('/api/export?format=csv&table=weight')
+    assert response.status_code == 200
+    assert 'weight-' in response.headers['Content-Disposition']
+    body = response.get_data(as_text=True)
+    assert body.splitlines()[0] == 'table,date,weight'
+
+    with app.app_context():
+        db.session.execute(db.delete(WeightLog))
+        db.session.commit()
+        report = log_import_service.import_stream(1, io.StringIO(body), 'csv')
+        assert report['imported']['weight'] == 1
+        assert db.session.scalar(db.select(WeightLog.weight)) == 80.5
@@ -0,0 +1,70 @@
+from app import db
+from app.models import FoodLog, RecipeIngredient
+
+CUP = "Per 1 cup - Calories: 206kcal | Fat: 0.44g | Carbs: 44.51g | Protein: 4.25g"
+TBSP = "Per 2 tbsp - Calories: 188kcal | Fat: 16.00g | Carbs: 6.00g | Protein: 8.00g"
+
+
+def _food_logs(app):
+    with app.app_context():
+        return db.session.scalars(db.select(FoodLog).order_by(FoodLog.id)).all()
+
+def _ingredients(app):
+    with app.app_context():
+        return db.session.scalars(db.select(RecipeIngredient).order_by(RecipeIngredient.id)).all()
+
+
+def test_diet_add_logs_cup_as_servings(app, client):
+    client.post('/diet/add', data={
+        'food_name': 'Ris', 'food_id': '1', 'food_description': CUP,
+        'meal_type': 'Lunch', 'servings': '2',
+    })
+    [log] = _food_logs(app)
+    assert log.calories == 412
+    assert log.protein == 8.5
+    assert log.grams == 0
+    assert log.base_servings_info == '2 × Per 1 cup'
+
+def test_diet_add_logs_tablespoons_as_servings(app, client):
+    client.post('/diet/add', data={
+        'food_name': 'Jordnötssmör', 'food_id': '2', 'food_description': TBSP,
+        'meal_type': 'Frukost', 'servings': '0.5',
+    })
+    [log] = _food_logs(app)
+    assert log.calories == 94
+    assert log.fat == 8
+    assert log.base_servings_info == '0.5 × Per 2 tbsp'
+
+def test_diet_add_asks_for_servings_when_grams_cannot_be_converted(app, client):
+    client.post('/diet/add', data={
+        'food_name': 'Ris', 'food_id': '1', 'food_description': CUP,
+        'meal_type': 'Lunch', 'grams': '100',
+    })
+    assert _food_logs(app) == []
+
+def test_recipe_builder_accepts_cup_and_tablespoon_servings(app, client):
+    response = client.post('/recipes', json={
+        'name': 'Risgröt',
+        'ingredients': [
+            {'food_name': 'Ris', 'food_id': '1', 'food_description': CUP, 'servings': 1.5},
+            {'food_name': 'Jordnötssmör', 'food_id': '2', 'food_description': TBSP, 'servings': 1},
+        ],
+    })
+    assert response.get_json()['success']
+    rice, peanut_butter = _ingredients(app)
+    assert rice.calories == 309
+    assert rice.grams == 0
+    assert peanut_butter.calories == 188
+    assert peanut_butter.protein == 8
+
+def test_recipe_builder_still_scales_grams(app, client):
+    client.post('/recipes', json={
+        'name': 'Kyckling',
+        'ingredients': [{
+            'food_name': 'Kyckling', 'food_id': '3', 'grams': 150,
+            'food_description': "Per 100g - Calories: 165kcal | Fat: 3.57g | Carbs: 0.00g | Protein: 31.02g",
+        }],
+    })
+    [chicken] = _ingredients(app)
+    assert chicken.grams == 150
+    assert chicken.calories == 247.5